@@ -1,10 +1,11 @@
 import os
 import secrets
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
 import dj_database_url
-from decouple import config
+from decouple import Csv, config
 from dotenv import find_dotenv, load_dotenv
 
 load_dotenv(find_dotenv())
@@ -223,3 +224,93 @@ ASSISTANT_ID = config("ASSISTANT_ID")
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
 APP_BASE_URL = config("APP_BASE_URL")
+
+# ==> OUTBOUND HTTP
+HTTP_CONNECT_TIMEOUT = config("HTTP_CONNECT_TIMEOUT", default=5, cast=float)
+HTTP_READ_TIMEOUT = config("HTTP_READ_TIMEOUT", default=30, cast=float)
+HTTP_MAX_RETRIES = config("HTTP_MAX_RETRIES", default=3, cast=int)
+HTTP_BACKOFF_FACTOR = config("HTTP_BACKOFF_FACTOR", default=0.5, cast=float)
+HTTP_POOL_MAXSIZE = config("HTTP_POOL_MAXSIZE", default=10, cast=int)
+
+# ==> PDF PIPELINE
+# Local, content-addressed cache of downloaded statement PDFs shared by every stage of a run
+PDF_CACHE_DIR = config(
+    "PDF_CACHE_DIR", default=os.path.join(tempfile.gettempdir(), "kemi-pdf-cache")
+)
+PDF_CACHE_MAX_BYTES = config("PDF_CACHE_MAX_BYTES", default=512 * 1024 * 1024, cast=int)
+# Statement downloads are streamed to the cache and aborted past these limits
+PDF_DOWNLOAD_MAX_BYTES = config(
+    "PDF_DOWNLOAD_MAX_BYTES", default=50 * 1024 * 1024, cast=int
+)
+PDF_DOWNLOAD_TIMEOUT = config("PDF_DOWNLOAD_TIMEOUT", default=60, cast=int)
+# Shard text-block and table extraction across this many processes (1 = serial). The pool
+# is billiard's, so it also runs inside Celery prefork workers
+PDF_EXTRACTION_WORKERS = config("PDF_EXTRACTION_WORKERS", default=1, cast=int)
+PDF_EXTRACTION_CHUNK_PAGES = config("PDF_EXTRACTION_CHUNK_PAGES", default=25, cast=int)
+# Fraction of the page (from the top) searched for table headers before the whole page
+HEADER_SEARCH_TOP_BAND = config("HEADER_SEARCH_TOP_BAND", default=0.5, cast=float)
+# Rendered page images kept per document (the first page is reused by categorization and
+# header discovery); pages sent to the vision model are never cached
+RENDER_CACHE_PAGES = config("RENDER_CACHE_PAGES", default=2, cast=int)
+# Type-3 (scanned) statements: pages sent to the vision model concurrently, and the
+# per-page retry budget and deadline (seconds, shared by all attempts on a page)
+VISION_CONCURRENCY = config("VISION_CONCURRENCY", default=5, cast=int)
+VISION_PAGE_MAX_ATTEMPTS = config("VISION_PAGE_MAX_ATTEMPTS", default=3, cast=int)
+VISION_PAGE_TIMEOUT = config("VISION_PAGE_TIMEOUT", default=180, cast=int)
+VISION_RETRY_BACKOFF = config("VISION_RETRY_BACKOFF", default=1.0, cast=float)
+# Where OpenAI calls go: "live" (the API), "record" (the API, appending every response to
+# LLM_CASSETTE_PATH) or "replay" (responses from LLM_CASSETTE_PATH only, each delayed by
+# LLM_REPLAY_LATENCY +/- LLM_REPLAY_LATENCY_JITTER seconds). The prompt cache is bypassed
+# while recording so every call reaches the cassette. Disable LLM_CACHE_ENABLED when
+# benchmarking against a cassette so every call pays the synthetic latency
+LLM_BACKEND_MODE = config("LLM_BACKEND_MODE", default="live")
+LLM_CASSETTE_PATH = config(
+    "LLM_CASSETTE_PATH",
+    default=os.path.join(tempfile.gettempdir(), "kemi-llm-cassette.jsonl"),
+)
+LLM_REPLAY_LATENCY = config("LLM_REPLAY_LATENCY", default=0.0, cast=float)
+LLM_REPLAY_LATENCY_JITTER = config("LLM_REPLAY_LATENCY_JITTER", default=0.0, cast=float)
+# Cache of OpenAI responses keyed by the exact prompt. LLM_CACHE_ALIAS names a Django
+# cache (e.g. a DatabaseCache or Redis cache) shared by all workers; when empty only the
+# in-process LRU is used
+LLM_CACHE_ENABLED = config("LLM_CACHE_ENABLED", default=True, cast=bool)
+LLM_CACHE_TTL = config("LLM_CACHE_TTL", default=7 * 24 * 60 * 60, cast=int)
+LLM_CACHE_LOCAL_MAXSIZE = config("LLM_CACHE_LOCAL_MAXSIZE", default=1024, cast=int)
+LLM_CACHE_ALIAS = config("LLM_CACHE_ALIAS", default="")
+# Gambling check: descriptions the local matcher cannot resolve are sent to the LLM in
+# chunks of this many, with at most GAMBLING_LLM_CONCURRENCY requests in flight
+GAMBLING_LLM_CHUNK_SIZE = config("GAMBLING_LLM_CHUNK_SIZE", default=50, cast=int)
+GAMBLING_LLM_CONCURRENCY = config("GAMBLING_LLM_CONCURRENCY", default=4, cast=int)
+# Column names matched to Date/Description/Credit/Debit with at least this confidence
+# (0-1) are resolved locally; the rest go to the LLM once and are stored
+COLUMN_RESOLVER_THRESHOLD = config(
+    "COLUMN_RESOLVER_THRESHOLD", default=0.85, cast=float
+)
+# Trailing windows (in months) the affordability metrics are reported over
+AFFORDABILITY_WINDOWS = config("AFFORDABILITY_WINDOWS", default="3,6,12", cast=Csv(int))
+# Type-3 pages whose rows fail the balance-continuity check are extracted once more at
+# this resolution
+VALIDATION_REEXTRACT_DPI = config("VALIDATION_REEXTRACT_DPI", default=300, cast=int)
+# Analysis pipeline stages: attempts per stage and the base of the exponential backoff
+# (seconds) between them. With PIPELINE_DB_CHECKPOINTS stage outputs are stored per PDF
+# until its result is stored or the run fails, and are ignored after
+# PIPELINE_CHECKPOINT_TTL seconds, so an interrupted run resumes from the last good stage
+PIPELINE_STAGE_MAX_ATTEMPTS = config("PIPELINE_STAGE_MAX_ATTEMPTS", default=3, cast=int)
+PIPELINE_RETRY_BACKOFF = config("PIPELINE_RETRY_BACKOFF", default=1.0, cast=float)
+PIPELINE_DB_CHECKPOINTS = config("PIPELINE_DB_CHECKPOINTS", default=True, cast=bool)
+PIPELINE_CHECKPOINT_TTL = config(
+    "PIPELINE_CHECKPOINT_TTL", default=24 * 60 * 60, cast=int
+)
+# Pending or running analysis jobs whose stage has not changed for this many seconds are
+# treated as abandoned (e.g. their worker died) and a new job is started on resubmission
+ANALYSIS_JOB_STALE_AFTER = config("ANALYSIS_JOB_STALE_AFTER", default=30 * 60, cast=int)
+# Running jobs refresh their timestamp this often (in seconds) so a long stage is not
+# taken for a dead worker; keep it well below ANALYSIS_JOB_STALE_AFTER
+ANALYSIS_JOB_HEARTBEAT = config("ANALYSIS_JOB_HEARTBEAT", default=60, cast=int)
+# Hosts analysis job webhooks may point at (https only); the finished analysis is posted
+# there, so webhooks are disabled while this is empty
+ANALYSIS_WEBHOOK_ALLOWED_HOSTS = config(
+    "ANALYSIS_WEBHOOK_ALLOWED_HOSTS", default="", cast=Csv()
+)
+# Bump whenever the pipeline output changes so stored analyses are recomputed
+ANALYSIS_PIPELINE_VERSION = config("ANALYSIS_PIPELINE_VERSION", default="4")
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class HttpMetrics:
+    """Thread-safe, in-process counters for outbound HTTP calls, grouped by host."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.hosts = {}
+
+    def _host_stats(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = {
+                "requests": 0,
+                "errors": 0,
+                "latency_sum": 0.0,
+                "latency_max": 0.0,
+                "latency_buckets": {bucket: 0 for bucket in LATENCY_BUCKETS},
+            }
+        return self.hosts[host]
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, host, elapsed, failed=False):
+        with self._lock:
+            self.in_flight -= 1
+            stats = self._host_stats(host)
+            stats["requests"] += 1
+            stats["errors"] += int(failed)
+            stats["latency_sum"] += elapsed
+            stats["latency_max"] = max(stats["latency_max"], elapsed)
+            for bucket in LATENCY_BUCKETS:
+                if elapsed <= bucket:
+                    stats["latency_buckets"][bucket] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "hosts": {
+                    host: {
+                        **stats,
+                        "latency_buckets": {
+                            str(bucket): count
+                            for bucket, count in stats["latency_buckets"].items()
+                        },
+                    }
+                    for host, stats in self.hosts.items()
+                },
+            }
+
+
+class HttpClient:
+    """
+    Shared requests client with keep-alive connection pools, default timeouts and
+    bounded retries with jittered exponential backoff.
+
+    Retries cover connection errors and 429/5xx responses on idempotent methods; once
+    they are exhausted the last response is returned so callers can still inspect it.
+    The underlying session is created per process so forked Celery workers never share
+    sockets with their parent.
+    """
+
+    def __init__(
+        self,
+        connect_timeout,
+        read_timeout,
+        max_retries,
+        backoff_factor,
+        pool_maxsize,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self.metrics = HttpMetrics()
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry,
+            pool_connections=self.pool_maxsize,
+            pool_maxsize=self.pool_maxsize,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                self._session = self._build_session()
+                self._session_pid = os.getpid()
+            return self._session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlparse(url).netloc
+
+        self.metrics.started()
+        start_time = time.monotonic()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self.metrics.finished(host, time.monotonic() - start_time, failed=failed)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+_http_client = None
+
+
+def get_http_client():
+    """Returns the process-wide HttpClient configured from settings."""
+    global _http_client
+    if _http_client is None:
+        _http_client = HttpClient(
+            connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+            read_timeout=settings.HTTP_READ_TIMEOUT,
+            max_retries=settings.HTTP_MAX_RETRIES,
+            backoff_factor=settings.HTTP_BACKOFF_FACTOR,
+            pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        )
+    return _http_client
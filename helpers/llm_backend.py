@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMissError(KeyError):
+    """A replayed request has no recorded response in the cassette."""
+
+
+def request_key(request):
+    """Stable sha256 of a chat completion request (model, messages, options)."""
+    payload = json.dumps(request, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMBackend:
+    """
+    Interface for chat completions. Responses are plain dicts in the OpenAI response
+    shape, e.g. response["choices"][0]["message"]["content"].
+    """
+
+    def chat_completion(self, **request):
+        raise NotImplementedError
+
+    async def achat_completion(self, **request):
+        raise NotImplementedError
+
+
+class LiveBackend(LLMBackend):
+    """
+    Calls the OpenAI API. The sync client is created per process so forked Celery
+    workers never share sockets with their parent, and the async client per event loop
+    since its connection pool is bound to the loop that created it.
+    """
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self._client = None
+        self._client_pid = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None or self._client_pid != os.getpid():
+                self._client = OpenAI(api_key=self.api_key)
+                self._client_pid = os.getpid()
+            return self._client
+
+    @property
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_clients:
+                self._async_clients[loop] = AsyncOpenAI(api_key=self.api_key)
+            return self._async_clients[loop]
+
+    def chat_completion(self, **request):
+        return self.client.chat.completions.create(**request).model_dump()
+
+    async def achat_completion(self, **request):
+        response = await self.async_client.chat.completions.create(**request)
+        return response.model_dump()
+
+
+class RecordingBackend(LLMBackend):
+    """
+    Passes requests to another backend and appends every response to a cassette, a
+    JSON Lines file of {"key", "model", "response"} records. Requests themselves are
+    not stored since they can carry whole page images; the key identifies them.
+    """
+
+    def __init__(self, backend, cassette_path):
+        self.backend = backend
+        self.cassette_path = cassette_path
+        self._lock = threading.Lock()
+
+    def record(self, request, response):
+        line = json.dumps(
+            {
+                "key": request_key(request),
+                "model": request.get("model"),
+                "response": response,
+            }
+        )
+        with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as cassette:
+                cassette.write(line + "\n")
+
+    def chat_completion(self, **request):
+        response = self.backend.chat_completion(**request)
+        self.record(request, response)
+        return response
+
+    async def achat_completion(self, **request):
+        response = await self.backend.achat_completion(**request)
+        await asyncio.to_thread(self.record, request, response)
+        return response
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Serves responses from a recorded cassette without any network access.
+
+    Each response is delayed by `latency` seconds, +/- up to `jitter` seconds, to
+    stand in for the API round trip. A request that was recorded several times gets
+    its responses in recorded order, repeating the last one.
+    """
+
+    def __init__(self, cassette_path, latency=0.0, jitter=0.0):
+        self.cassette_path = cassette_path
+        self.latency = latency
+        self.jitter = jitter
+        self.responses = {}
+        self._served = {}
+        self._lock = threading.Lock()
+
+        with open(cassette_path, encoding="utf-8") as cassette:
+            for line in cassette:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses.setdefault(record["key"], []).append(
+                        record["response"]
+                    )
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def lookup(self, request):
+        key = request_key(request)
+        responses = self.responses.get(key)
+        if not responses:
+            raise CassetteMissError(
+                f"No recorded response for {request.get('model')} request {key}"
+            )
+        with self._lock:
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        return responses[min(served, len(responses) - 1)]
+
+    def chat_completion(self, **request):
+        response = self.lookup(request)
+        time.sleep(self.delay())
+        return response
+
+    async def achat_completion(self, **request):
+        response = self.lookup(request)
+        await asyncio.sleep(self.delay())
+        return response
+
+
+_llm_backend = None
+
+
+def get_llm_backend():
+    """Returns the process-wide LLM backend for the configured LLM_BACKEND_MODE."""
+    global _llm_backend
+    if _llm_backend is None:
+        mode = settings.LLM_BACKEND_MODE
+        if mode == LIVE:
+            _llm_backend = LiveBackend(settings.OPENAI_API_KEY)
+        elif mode == RECORD:
+            _llm_backend = RecordingBackend(
+                LiveBackend(settings.OPENAI_API_KEY), settings.LLM_CASSETTE_PATH
+            )
+        elif mode == REPLAY:
+            _llm_backend = ReplayBackend(
+                settings.LLM_CASSETTE_PATH,
+                latency=settings.LLM_REPLAY_LATENCY,
+                jitter=settings.LLM_REPLAY_LATENCY_JITTER,
+            )
+        else:
+            raise ValueError(f"Unknown LLM_BACKEND_MODE {mode!r}")
+    return _llm_backend
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from verification.pdf.result_store import get_pipeline_version, invalidate_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored bank statement analyses and pipeline checkpoints. By default "
+        "only results produced by a pipeline version other than the current one (and "
+        "expired checkpoints) are removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--document-id", help="Only invalidate this document.")
+        parser.add_argument(
+            "--content-hash", help="Only invalidate results for this PDF content hash."
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Also remove results produced by the current pipeline version.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = invalidate_results(
+            document_id=options["document_id"],
+            content_hash=options["content_hash"],
+            stale_only=not options["all"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Removed {deleted} stored analyses (current pipeline version: {get_pipeline_version()})."
+            )
+        )
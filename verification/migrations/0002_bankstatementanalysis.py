@@ -0,0 +1,45 @@
+# Generated by Django 4.2.8 on 2026-10-17 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BankStatementAnalysis",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("document_id", models.CharField(db_index=True, max_length=100)),
+                ("content_hash", models.CharField(db_index=True, max_length=64)),
+                ("pipeline_version", models.CharField(db_index=True, max_length=50)),
+                ("pdf_type", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("result", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Bank Statement Analysis",
+                "verbose_name_plural": "Bank Statement Analyses",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="bankstatementanalysis",
+            constraint=models.UniqueConstraint(
+                fields=("document_id", "pipeline_version"),
+                name="unique_analysis_per_document_version",
+            ),
+        ),
+    ]
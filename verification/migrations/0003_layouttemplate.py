@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-17 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0002_bankstatementanalysis"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LayoutTemplate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=64, unique=True)),
+                ("header_columns", models.JSONField()),
+                ("target_columns", models.JSONField()),
+                ("header_bboxes", models.JSONField()),
+                ("stride", models.PositiveSmallIntegerField()),
+                ("column_boundaries", models.JSONField(default=list)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Layout Template",
+                "verbose_name_plural": "Layout Templates",
+            },
+        ),
+    ]
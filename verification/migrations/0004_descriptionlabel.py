@@ -0,0 +1,46 @@
+# Generated by Django 4.2.8 on 2026-10-17 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0003_layouttemplate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DescriptionLabel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("canonical", models.CharField(max_length=255, unique=True)),
+                ("label", models.CharField(db_index=True, max_length=50)),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("merchant", "Known merchant"),
+                            ("rule", "Local rule"),
+                            ("llm", "LLM"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Description Label",
+                "verbose_name_plural": "Description Labels",
+            },
+        ),
+    ]
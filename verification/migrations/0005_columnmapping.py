@@ -0,0 +1,52 @@
+# Generated by Django 4.2.8 on 2026-10-17 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0004_descriptionlabel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ColumnMapping",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("header_mapping", "Header mapping"),
+                            ("arrange_columns", "Arrange columns"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("key", models.CharField(max_length=64)),
+                ("columns", models.JSONField()),
+                ("mapping", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Column Mapping",
+                "verbose_name_plural": "Column Mappings",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="columnmapping",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "key"), name="unique_column_mapping_per_kind"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.8 on 2026-10-17 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0005_columnmapping"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnalysisCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64)),
+                ("pipeline_version", models.CharField(max_length=50)),
+                ("stage", models.CharField(max_length=50)),
+                ("output", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Analysis Checkpoint",
+                "verbose_name_plural": "Analysis Checkpoints",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="analysischeckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("content_hash", "pipeline_version", "stage"),
+                name="unique_checkpoint_per_content_version_stage",
+            ),
+        ),
+    ]
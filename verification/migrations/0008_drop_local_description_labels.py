@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def drop_local_labels(apps, schema_editor):
+    # Labels from local rules are no longer stored or read; earlier ones may come from
+    # the substring merchant matcher and must not be reused
+    DescriptionLabel = apps.get_model("verification", "DescriptionLabel")
+    DescriptionLabel.objects.exclude(source="llm").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0007_analysisjob"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_local_labels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-17 11:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0008_drop_local_description_labels"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="layouttemplate",
+            name="column_boundaries",
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.8 on 2026-10-17 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0009_remove_layouttemplate_column_boundaries"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="descriptionlabel",
+            name="source",
+            field=models.CharField(
+                choices=[("llm", "LLM")], default="llm", max_length=20
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.8 on 2026-10-17 11:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("verification", "0010_descriptionlabel_llm_source_only"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="analysisjob",
+            name="created_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="analysis_jobs",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-17 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("verification", "0011_analysisjob_created_by"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="analysisjob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["pending", "running"])),
+                fields=("document_id", "created_by"),
+                name="unique_active_analysis_job",
+            ),
+        ),
+    ]
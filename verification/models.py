@@ -1,5 +1,7 @@
+import uuid
 from datetime import timedelta
 
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
@@ -59,3 +61,224 @@ class PDFFile(models.Model):
     class Meta:
         verbose_name = "PDF File"
         verbose_name_plural = "PDF Files"
+
+
+class BankStatementAnalysis(models.Model):
+    """
+    Stored result of the bank statement pipeline for one document.
+
+    Results are looked up by document id or by the SHA-256 of the PDF content, and only
+    count as hits for the pipeline version that produced them.
+    """
+
+    document_id = models.CharField(max_length=100, db_index=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    pipeline_version = models.CharField(max_length=50, db_index=True)
+    pdf_type = models.PositiveSmallIntegerField(null=True, blank=True)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Bank Statement Analysis"
+        verbose_name_plural = "Bank Statement Analyses"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["document_id", "pipeline_version"],
+                name="unique_analysis_per_document_version",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} ({self.pipeline_version})"
+
+
+class LayoutTemplate(models.Model):
+    """
+    Table layout learned from a successfully parsed type-2 statement.
+
+    Keyed by a fingerprint of the issuing bank's PDF (metadata and fonts), so later
+    statements from the same bank can skip LLM header discovery and fuzzy header search.
+    """
+
+    fingerprint = models.CharField(max_length=64, unique=True)
+    header_columns = models.JSONField()
+    target_columns = models.JSONField()
+    header_bboxes = models.JSONField()
+    stride = models.PositiveSmallIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Layout Template"
+        verbose_name_plural = "Layout Templates"
+
+    def __str__(self):
+        return self.fingerprint
+
+
+class DescriptionLabel(models.Model):
+    """
+    Classification of a canonical transaction description, e.g. "pos purchase shoprite".
+
+    Descriptions are canonicalized (reference numbers, dates and amounts stripped) before
+    classification, so each distinct merchant or charge is sent to the LLM once and its
+    label reused by every later statement. Only LLM labels are stored; local rules are
+    cheap and re-applied on every run.
+    """
+
+    SOURCE_LLM = "llm"
+    SOURCE_CHOICES = [
+        (SOURCE_LLM, "LLM"),
+    ]
+
+    canonical = models.CharField(max_length=255, unique=True)
+    label = models.CharField(max_length=50, db_index=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default=SOURCE_LLM)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Description Label"
+        verbose_name_plural = "Description Labels"
+
+    def __str__(self):
+        return f"{self.canonical} ({self.label})"
+
+
+class ColumnMapping(models.Model):
+    """
+    Column mapping the LLM resolved for a set of statement column names.
+
+    The local synonym resolver handles most headers; names it cannot resolve with enough
+    confidence go to the LLM once and its answer is kept here for every later statement
+    with the same columns.
+    """
+
+    KIND_HEADER_MAPPING = "header_mapping"
+    KIND_ARRANGE_COLUMNS = "arrange_columns"
+    KIND_CHOICES = [
+        (KIND_HEADER_MAPPING, "Header mapping"),
+        (KIND_ARRANGE_COLUMNS, "Arrange columns"),
+    ]
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    key = models.CharField(max_length=64)
+    columns = models.JSONField()
+    mapping = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Column Mapping"
+        verbose_name_plural = "Column Mappings"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "key"], name="unique_column_mapping_per_kind"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.columns}"
+
+
+class AnalysisCheckpoint(models.Model):
+    """
+    Output of one stage of the bank statement pipeline for a PDF.
+
+    Kept until the full result is stored, so a run that fails in a later stage (e.g.
+    the gambling check) resumes from here instead of extracting the statement again.
+    """
+
+    content_hash = models.CharField(max_length=64)
+    pipeline_version = models.CharField(max_length=50)
+    stage = models.CharField(max_length=50)
+    output = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Analysis Checkpoint"
+        verbose_name_plural = "Analysis Checkpoints"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_hash", "pipeline_version", "stage"],
+                name="unique_checkpoint_per_content_version_stage",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.content_hash} ({self.pipeline_version}): {self.stage}"
+
+
+class AnalysisJob(models.Model):
+    """
+    A bank statement analysis submitted through the job API and run on a Celery worker.
+
+    `stage` is the pipeline stage being run while the job is running. When the job
+    finishes, the result or error is kept here and, if a webhook URL was given, posted
+    to it. Only the user who submitted a job (or staff) can see it.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    document_id = models.CharField(max_length=100, db_index=True)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True
+    )
+    stage = models.CharField(max_length=50, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    webhook_url = models.URLField(max_length=500, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="analysis_jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Analysis Job"
+        verbose_name_plural = "Analysis Jobs"
+        constraints = [
+            # At most one pending or running job per document and user, so concurrent
+            # submissions cannot both start one
+            models.UniqueConstraint(
+                fields=["document_id", "created_by"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="unique_active_analysis_job",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.document_id}): {self.status}"
+
+    def to_dict(self):
+        return {
+            "job_id": str(self.id),
+            "document_id": self.document_id,
+            "status": self.status,
+            "stage": self.stage,
+            "result": self.result,
+            "error": self.error or None,
+            "created_at": self.created_at.isoformat(),
+            "completed_at": (
+                self.completed_at.isoformat() if self.completed_at else None
+            ),
+        }
@@ -0,0 +1,66 @@
+import pandas as pd
+
+# Compact, Arrow-backed dtype for statement text columns
+ARROW_STRING = "string[pyarrow]"
+
+# Patterns are kept RE2-compatible (no lookarounds) so they run as Arrow compute kernels
+_SIGN_SUFFIX = r"\s*(?:CR|DR)\.?$"
+_NEGATIVE = r"^\(|^-|-$|DR\.?$"
+_CREDIT_SUFFIX = r"CR\.?$"
+_SEPARATORS = r"[\s,()+-]"
+_CURRENCY_PREFIX = r"^(?:₦|NGN|CAD|USD|\$|£|€|N)"
+
+
+def to_arrow_strings(values):
+    """A column of statement text as stripped Arrow strings (missing values kept as NA)."""
+    series = pd.Series(values, copy=False)
+    return series.astype(ARROW_STRING).str.strip()
+
+
+def parse_amounts(values):
+    """
+    Vectorized parse of statement amounts into float64, NaN where there is no amount.
+
+    Handles currency prefixes (₦1,200.00, N500, NGN 20), thousands separators,
+    parenthesised and leading/trailing minus negatives ((500.00), -25, 25-) and CR/DR
+    suffixes (1,000.00 CR is positive, 1,000.00 DR negative). Placeholders such as "-"
+    or "Not Visible" become NaN.
+    """
+    strings = to_arrow_strings(values).str.upper()
+
+    negative = strings.str.contains(_NEGATIVE, regex=True).fillna(False)
+    cleaned = (
+        strings.str.replace(_SIGN_SUFFIX, "", regex=True)
+        .str.replace(_SEPARATORS, "", regex=True)
+        .str.replace(_CURRENCY_PREFIX, "", regex=True)
+    )
+
+    amounts = pd.to_numeric(cleaned, errors="coerce").astype("float64")
+    return amounts.where(~negative.astype(bool), -amounts)
+
+
+def parse_flows(credits, debits):
+    """
+    Inflow and outflow per row from a statement's Credit and Debit columns, as float64
+    rounded to kobo/cents with 0 where there is no amount.
+
+    The column gives the direction unless the notation says otherwise: a negative credit,
+    e.g. (500.00) or 500.00 DR, is a reversal and counts as outflow, and a debit marked
+    CR counts as inflow. Minus signs and parentheses in the Debit column are the usual
+    way of printing debits and stay outflows.
+    """
+    credit = parse_amounts(credits)
+    debit = parse_amounts(debits)
+    debit_is_inflow = (
+        to_arrow_strings(debits)
+        .str.upper()
+        .str.contains(_CREDIT_SUFFIX, regex=True)
+        .fillna(False)
+        .astype(bool)
+    )
+
+    inflow = credit.clip(lower=0).fillna(0) + debit.where(debit_is_inflow).fillna(0)
+    outflow = (-credit).clip(lower=0).fillna(0) + debit.where(
+        ~debit_is_inflow
+    ).abs().fillna(0)
+    return inflow.round(2), outflow.round(2)
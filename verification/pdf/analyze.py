@@ -1,11 +1,8 @@
-import time
-
-import numpy as np
 from django.db import connections
 
 from bankanalysis.configs.logging_config import configure_logger
-from verification.pdf.df_analyzer import TransactionSummary
-from verification.pdf.pdf_manager import PDFDataManager
+from verification.pdf.result_store import lookup_result
+from verification.pdf.session import DocumentAnalysisSession
 
 logger = configure_logger(__name__)
 
@@ -42,86 +39,20 @@ def get_document_file_by_id(document_id):
         return None
 
 
-def convert_numpy(obj):
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, dict):
-        return {k: convert_numpy(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy(item) for item in obj]
-    else:
-        return obj
-
-
-def get_pdf_category(document_id):
+def get_analysis_session(document_id):
     document_data = get_document_file_by_id(document_id)
+    if document_data is None:
+        raise ValueError(f"Document {document_id} not found")
     public_url = document_data["cloudinary_link"]
 
-    # Initialize PDFDataManager with the given PDF path
-    pdf_data_manager = PDFDataManager(pdf_url=public_url)
-    pdf_type = pdf_data_manager.categorize_pdf()
-    print("PDF TYPE: ", pdf_type)
-
-    return pdf_type, public_url
-
-
-def process_pdf_with_retry(pdf_type, public_url, max_retries=5):
-    start_time = time.time()
-    pdf_data_manager = PDFDataManager(pdf_url=public_url)
-    # Initialize the retry count
-    retries = 0
-    while retries < max_retries:
-        try:
-            # Process PDF based on its type
-            if pdf_type == 1:
-                extracted_data, target_columns = pdf_data_manager.process_pdf_tables()
-                transaction_summary = TransactionSummary(
-                    extracted_data, header_columns=target_columns
-                )
-            elif pdf_type == 2:
-                extracted_data = pdf_data_manager.process_pdf()
-                transaction_summary = TransactionSummary(extracted_data)
-            elif pdf_type == 3:
-                extracted_data = pdf_data_manager.process_pdf_with_vision()
-                transaction_summary = TransactionSummary(extracted_data)
-            else:
-                # Handle unexpected PDF type
-                print("Unknown PDF type.")
-                return None
-
-            # Initialize TransactionSummary with extracted data and target columns
-            monthly_summary = transaction_summary.generate_monthly_summary()
-            gambling_activities = transaction_summary.check_gambling_activities()
-
-            # Combine the results
-            combined_result = {
-                "monthly_summary": monthly_summary.to_dict(
-                    "records"
-                ),  # Convert DataFrame to list of dicts
-                "gambling_activities": gambling_activities,
-            }
-            result_converted = convert_numpy(combined_result)
-            print(time.time() - start_time)
-
-            # If the process succeeds, break out of the loop
-            return result_converted
-        except Exception as e:
-            print(f"An error occurred: {e}. Retrying...")
-            retries += 1
-            time.sleep(1)  # Optional: wait a second before retrying
-
-    # If the function reaches this point, it means all retries have failed
-    print(f"Failed to process PDF after {max_retries} attempts.")
-    return None
-
-
-# pdf_path = "wema_statement.pdf"
-# # pdf_path = "gt_statement.pdf"
-# # pdf_path = "foreign_statement.pdf"
-# # pdf_path = "gtb_statement.pdf"
-# # pdf_path = "zen_statement.pdf"
+    # The session memoizes the category and headers for the rest of the run
+    return DocumentAnalysisSession(document_id=document_id, pdf_url=public_url)
 
-# pdf_type, pdf_data_manager = get_pdf_category(pdf_path)
 
-# result = process_pdf_with_retry(pdf_type, pdf_data_manager)
-# print(result)
+def get_stored_analysis(document_id):
+    """
+    Returns a stored result for the document id, without downloading anything. Results
+    for the same PDF under another document id are found by the pipeline once it has
+    downloaded the PDF.
+    """
+    return lookup_result(document_id=document_id)
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import re
+
+from django.conf import settings
+from fuzzywuzzy import fuzz
+
+from bankanalysis.configs.logging_config import configure_logger
+from verification.models import ColumnMapping
+from verification.pdf.openai_chat import match_header_columns, swap_columns
+
+logger = configure_logger(__name__)
+
+REQUIRED_COLUMNS = ["Date", "Description", "Credit", "Debit"]
+OPTIONAL_COLUMNS = ["Balance"]
+
+# Column names seen on statement tables, by the column they map to. Names are compared
+# lowercase with punctuation removed, see normalize_column_name
+COLUMN_SYNONYMS = {
+    "Date": [
+        "date",
+        "transaction date",
+        "trans date",
+        "txn date",
+        "tran date",
+        "trans date time",
+        "posting date",
+        "posted date",
+        "date posted",
+        "value date",
+        "entry date",
+    ],
+    "Description": [
+        "description",
+        "transaction description",
+        "transaction details",
+        "details",
+        "narration",
+        "narrative",
+        "remarks",
+        "particulars",
+        "memo",
+        "transaction",
+        "transactions",
+    ],
+    "Credit": [
+        "credit",
+        "credits",
+        "credit amount",
+        "credit amt",
+        "deposit amount",
+        "deposit",
+        "deposits",
+        "deposits credits",
+        "money in",
+        "paid in",
+        "inflow",
+        "inflows",
+        "lodgement",
+        "lodgements",
+        "cr",
+    ],
+    "Debit": [
+        "debit",
+        "debits",
+        "debit amount",
+        "debit amt",
+        "withdrawal amount",
+        "withdrawal",
+        "withdrawals",
+        "withdrawals debits",
+        "cheques debits",
+        "money out",
+        "paid out",
+        "outflow",
+        "outflows",
+        "dr",
+    ],
+    "Balance": [
+        "balance",
+        "running balance",
+        "available balance",
+        "ledger balance",
+        "bal",
+    ],
+}
+
+_SYNONYM_LOOKUP = {
+    synonym: column
+    for column, synonyms in COLUMN_SYNONYMS.items()
+    for synonym in synonyms
+}
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_column_name(name):
+    return _NON_ALPHANUMERIC.sub(" ", str(name).lower()).strip()
+
+
+def score_column(name, column):
+    """Confidence in [0, 1] that a statement column name means `column`."""
+    normalized = normalize_column_name(name)
+    if _SYNONYM_LOOKUP.get(normalized) == column:
+        return 1.0
+    return (
+        max(
+            fuzz.token_sort_ratio(normalized, synonym)
+            for synonym in COLUMN_SYNONYMS[column]
+        )
+        / 100
+    )
+
+
+def match_column(name, columns=None):
+    """(column, confidence) of the best match for a column name among `columns`."""
+    columns = columns or list(COLUMN_SYNONYMS)
+    scores = {column: score_column(name, column) for column in columns}
+    column = max(scores, key=scores.get)
+    return column, scores[column]
+
+
+def resolve_headers(names, columns=None):
+    """
+    Assigns each of `columns` (REQUIRED_COLUMNS by default) to a different name from
+    `names`, best scoring pairs first. Returns ({column: name}, confidence), where the
+    confidence is the lowest score of the assignment and 0 if a column is left over.
+    """
+    columns = columns or REQUIRED_COLUMNS
+    # Best score first; on ties the leftmost name wins (Txn Date over Value Date)
+    candidates = sorted(
+        (
+            (-score_column(name, column), position, column)
+            for position, name in enumerate(names)
+            for column in columns
+        )
+    )
+
+    mapping = {}
+    used = set()
+    confidence = 1.0
+    for negative_score, position, column in candidates:
+        if column in mapping or position in used:
+            continue
+        mapping[column] = names[position]
+        used.add(position)
+        confidence = min(confidence, -negative_score)
+
+    if len(mapping) < len(columns):
+        confidence = 0.0
+    return mapping, confidence
+
+
+def _mapping_key(names):
+    normalized = [normalize_column_name(name) for name in names]
+    return hashlib.sha256(json.dumps(normalized).encode("utf-8")).hexdigest()
+
+
+def _get_stored_mapping(kind, names):
+    stored = ColumnMapping.objects.filter(kind=kind, key=_mapping_key(names)).first()
+    return stored.mapping if stored is not None else None
+
+
+def _store_mapping(kind, names, mapping):
+    ColumnMapping.objects.update_or_create(
+        kind=kind,
+        key=_mapping_key(names),
+        defaults={"columns": list(names), "mapping": mapping},
+    )
+
+
+def map_header_columns(vision_columns):
+    """
+    The statement's column names for Date, Description, Credit and Debit, in that order.
+
+    Resolved locally when every column matches with at least COLUMN_RESOLVER_THRESHOLD
+    confidence; otherwise from a stored LLM answer for the same names, and only failing
+    that by asking the LLM (whose answer is then stored).
+    """
+    mapping, confidence = resolve_headers(vision_columns)
+    if confidence >= settings.COLUMN_RESOLVER_THRESHOLD:
+        return [mapping[column] for column in REQUIRED_COLUMNS]
+
+    # Stored as positions, since names differing only in case or punctuation share a key
+    positions = _get_stored_mapping(ColumnMapping.KIND_HEADER_MAPPING, vision_columns)
+    if positions is not None:
+        return [vision_columns[position] for position in positions]
+
+    logger.info(
+        f"Resolving header columns {vision_columns} with the LLM "
+        f"(confidence {confidence:.2f})"
+    )
+    target_columns = match_header_columns(vision_columns)
+    if all(column in vision_columns for column in target_columns):
+        _store_mapping(
+            ColumnMapping.KIND_HEADER_MAPPING,
+            vision_columns,
+            [vision_columns.index(column) for column in target_columns],
+        )
+    return target_columns
+
+
+def arrange_columns(target_columns):
+    """
+    Local replacement for swap_columns: the standard name (Date, Description, Credit,
+    Debit) of each of the statement's target columns, falling back to a stored or new
+    LLM answer like map_header_columns.
+    """
+    matches = [match_column(name, REQUIRED_COLUMNS) for name in target_columns]
+    arranged = [column for column, _ in matches]
+    if len(set(arranged)) == len(arranged) and all(
+        confidence >= settings.COLUMN_RESOLVER_THRESHOLD for _, confidence in matches
+    ):
+        return arranged
+
+    arranged = _get_stored_mapping(ColumnMapping.KIND_ARRANGE_COLUMNS, target_columns)
+    if arranged is not None:
+        return arranged
+
+    logger.info(f"Arranging columns {target_columns} with the LLM")
+    arranged = swap_columns(target_columns)
+    if sorted(arranged) == sorted(REQUIRED_COLUMNS):
+        _store_mapping(ColumnMapping.KIND_ARRANGE_COLUMNS, target_columns, arranged)
+    return arranged
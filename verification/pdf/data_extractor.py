@@ -1,24 +1,59 @@
+import numpy as np
+
+
 class DataExtractor:
     """Extracts data using the defined grid."""
 
     @staticmethod
-    def extract_data_using_grid(text_blocks, grid):
+    def extract_data_using_grid(spans, grid):
+        cell_bboxes = [cell["bbox"] for row in grid for cell in row]
+        cell_texts = DataExtractor.find_texts_in_bboxes(spans, cell_bboxes)
+
         extracted_data = []
+        position = 0
         for row in grid:
-            row_data = []
-            for cell in row:
-                cell_text = DataExtractor.find_text_in_bbox(text_blocks, cell["bbox"])
-                row_data.append(cell_text)
-            extracted_data.append(row_data)
+            extracted_data.append(cell_texts[position : position + len(row)])
+            position += len(row)
         return extracted_data
 
     @staticmethod
-    def find_text_in_bbox(text_blocks, bbox):
-        cell_texts = []
-        for block in text_blocks:
-            if DataExtractor.block_overlaps_bbox(block["bbox"], bbox):
-                cell_texts.append(block["text"])
-        return " ".join(cell_texts).strip()
+    def find_text_in_bbox(spans, bbox):
+        return DataExtractor.find_texts_in_bboxes(spans, [bbox])[0]
+
+    @staticmethod
+    def find_texts_in_bboxes(spans, bboxes):
+        """
+        Join the text of the spans overlapping each bbox, for all bboxes at once.
+
+        Builds one (cells x spans) overlap mask with the same semantics as
+        block_overlaps_bbox instead of testing every span against every cell in Python.
+        """
+        if not bboxes:
+            return []
+
+        cells = np.asarray(bboxes, dtype=np.float64)
+        cell_left, cell_top = cells[:, 0:1], cells[:, 1:2]
+        cell_right, cell_bottom = cells[:, 2:3], cells[:, 3:4]
+
+        # Compare in float64: the grid edges are Python floats (e.g. the date column's
+        # right edge sits 1e-10 left of the next column) that float32 cannot represent
+        block_left = spans.x0.astype(np.float64)
+        block_top = spans.y0.astype(np.float64)
+        block_right = spans.x1.astype(np.float64)
+        block_bottom = spans.y1.astype(np.float64)
+
+        overlaps = ~(
+            (block_right < cell_left)
+            | (block_left > cell_right)
+            | (block_bottom < cell_top)
+            | (block_top > cell_bottom)
+        )
+
+        texts = spans.text
+        return [
+            " ".join(texts[position] for position in np.flatnonzero(cell_mask)).strip()
+            for cell_mask in overlaps
+        ]
 
     @staticmethod
     def block_overlaps_bbox(block_bbox, cell_bbox):
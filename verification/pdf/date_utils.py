@@ -1,13 +1,194 @@
+import calendar
+import re
+from collections import Counter
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
 from dateutil.parser import parse
 
+MONTH_NAMES = [name.lower() for name in calendar.month_name]
+
+# Formats used by the Nigerian and Canadian statements we see, e.g. 02-Jan-2023, 4 Jul,
+# 27-Oct, 01/12/2022 (day first), 2023-01-02 and 20230102, optionally followed by a time
+_TIME = r"(?:\s+\d{1,2}:\d{2}(?::\d{2})?(?:\s*[AaPp][Mm])?)?"
+DATE_PATTERNS = [
+    re.compile(
+        r"^(?P<day>\d{1,2})(?:[-\s/.])(?P<month>[A-Za-z]{3,9})\.?"
+        r"(?:(?:[-\s/.,]+)(?P<year>\d{4}|\d{2}))?" + _TIME + r"$"
+    ),
+    re.compile(
+        r"^(?P<day>\d{1,2})(?:[/.-])(?P<month>\d{1,2})(?:[/.-])(?P<year>\d{4}|\d{2})"
+        + _TIME
+        + r"$"
+    ),
+    re.compile(
+        r"^(?P<year>\d{4})(?:-)(?P<month>\d{1,2})(?:-)(?P<day>\d{1,2})" + _TIME + r"$"
+    ),
+    # Compact yyyymmdd, which dateutil would read day first as yyyyddmm
+    re.compile(r"^(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})$"),
+    re.compile(
+        r"^(?P<month>[A-Za-z]{3,9})\.?(?:\s+)(?P<day>\d{1,2})"
+        r"(?:(?:,?\s+)(?P<year>\d{4}))?" + _TIME + r"$"
+    ),
+]
+
+# Amounts such as 1,200.00, (500.00), -25, N1,000.00 CR are never dates, although
+# dateutil's fuzzy parser happily accepts many of them. Bare digit strings are left to
+# dateutil as before, since "12", "2022" and "20230102" (yyyymmdd) are dates to it
+AMOUNT_PATTERN = re.compile(
+    r"^(?!\s*\d+\s*$)[\s(+-]*(?:[₦$£€]|NGN|CAD|USD|N)?\s*[\d,]*\d(?:\.\d+)?\s*(?:CR|DR)?\)?\s*$",
+    re.IGNORECASE,
+)
+
+
+def _month_number(month):
+    """Month number for 1-12, a full month name or any prefix of one (Jan, Sept)."""
+    if month.isdigit():
+        return int(month)
+    month = month.lower()
+    for number, name in enumerate(MONTH_NAMES[1:], start=1):
+        if name.startswith(month):
+            return number
+    return None
+
+
+def _year_from_match(year, today):
+    if year is None:
+        # Same default as dateutil, which fills a missing year with the current one
+        return today.year
+    year = int(year)
+    if year < 100:
+        year += 2000 if year < 69 else 1900
+    return year
+
+
+def _format_from_match(match):
+    """The strptime format equivalent to a fast-path match, or None if there is none."""
+    groups = match.groupdict()
+    if groups["year"] is None:
+        return None  # Formats without a year cannot be parsed with an explicit format
+    if match.end() != max(match.end(name) for name in ("day", "month", "year")):
+        return None  # Trailing time component
+
+    month = groups["month"]
+    if month.isdigit():
+        month_directive = "%m"
+    elif len(month) == 3:
+        month_directive = "%b"
+    elif month.lower() in MONTH_NAMES:
+        month_directive = "%B"
+    else:
+        return None  # Abbreviations such as Sept have no strptime directive
+
+    directives = {
+        "day": "%d",
+        "month": month_directive,
+        "year": "%Y" if len(groups["year"]) == 4 else "%y",
+    }
+    names = sorted(directives, key=match.start)
+    fmt = ""
+    position = 0
+    for name in names:
+        fmt += match.string[position : match.start(name)].replace("%", "%%")
+        fmt += directives[name]
+        position = match.end(name)
+    return fmt + match.string[position:].replace("%", "%%")
+
+
+def _classify(string):
+    """Returns (parsed datetime, strptime format) for a candidate string, or (None, None)."""
+    # Dates without a year (or month) are completed from today, so today is part of the
+    # cache key; entries from previous days simply age out of the LRU
+    return _classify_on(string, date.today())
+
+
+@lru_cache(maxsize=65536)
+def _classify_on(string, today):
+    if not isinstance(string, str):
+        return None, None
+    candidate = string.strip()
+    if not candidate or AMOUNT_PATTERN.match(candidate):
+        return None, None
+
+    for pattern in DATE_PATTERNS:
+        match = pattern.match(candidate)
+        if match is None:
+            continue
+
+        month = _month_number(match.group("month"))
+        if month is None:
+            continue
+        try:
+            parsed = datetime(
+                _year_from_match(match.group("year"), today),
+                month,
+                int(match.group("day")),
+            )
+        except ValueError:
+            return None, None
+        return parsed, _format_from_match(match)
+
+    # Anything else goes to the slow, fuzzy dateutil parser
+    try:
+        default = datetime(today.year, today.month, today.day)
+        return parse(candidate, fuzzy=True, dayfirst=True, default=default), None
+    except (ValueError, OverflowError):
+        return None, None
+
 
 class DateValidator:
     """Utility class for date validation."""
 
     @staticmethod
     def is_valid_date(string):
-        try:
-            parse(string, fuzzy=True)
-            return True
-        except ValueError:
-            return False
+        return _classify(string)[0] is not None
+
+    @staticmethod
+    def parse_date(string):
+        """The parsed datetime for a date string, or None. Results are memoized."""
+        return _classify(string)[0]
+
+    @staticmethod
+    def match_format(string):
+        """The strptime format of a fast-path date string with a year, or None."""
+        return _classify(string)[1]
+
+
+def infer_date_format(values, sample_size=50):
+    """
+    The most common strptime format among the first distinct values of a date column,
+    or None if none of them is a fast-path date with a year.
+    """
+    formats = Counter()
+    for value in pd.unique(values.dropna())[:sample_size]:
+        fmt = DateValidator.match_format(value)
+        if fmt is not None:
+            formats[fmt] += 1
+    return formats.most_common(1)[0][0] if formats else None
+
+
+def parse_date_column(values):
+    """
+    Parses a column of statement dates to datetime64, NaT where there is no date.
+
+    The format is inferred once for the column and applied in one vectorized
+    to_datetime call; values that do not fit it (other layouts, dates without a year)
+    fall back to the memoized DateValidator.parse_date.
+    """
+    strings = pd.Series(values, copy=False).astype("string[pyarrow]").str.strip()
+    parsed = pd.Series(pd.NaT, index=strings.index, dtype="datetime64[ns]")
+
+    fmt = infer_date_format(strings)
+    if fmt is not None:
+        parsed = pd.to_datetime(strings, format=fmt, errors="coerce").astype(
+            "datetime64[ns]"
+        )
+
+    remaining = parsed.isna() & strings.notna()
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(
+            strings[remaining].map(DateValidator.parse_date, na_action="ignore"),
+            errors="coerce",
+        )
+    return parsed
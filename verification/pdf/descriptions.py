@@ -0,0 +1,68 @@
+import re
+
+from verification.models import DescriptionLabel
+
+CANONICAL_MAX_LENGTH = DescriptionLabel._meta.get_field("canonical").max_length
+
+# Dates such as 02-Jan-2023, 02 JAN 23, 01/12/2022 and 2023-01-02, with an optional time
+_DATE = re.compile(
+    r"\b(?:\d{1,2}[-/. ](?:[a-z]{3,9}|\d{1,2})[-/. ]\d{2,4}|\d{4}-\d{1,2}-\d{1,2})"
+    r"(?:\s+\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]m)?)?\b"
+)
+_TIME = re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?(?:\s*[ap]m)?\b")
+# Amounts such as N1,500.00, ₦2,000, NGN 2000 and 1,200.50
+_AMOUNT = re.compile(
+    r"(?:₦\s*|\bngn\s*)\d[\d,]*(?:\.\d+)?"
+    r"|(?:\bn(?=\d)|\b)(?:\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+\.\d{2})\b"
+)
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def _is_reference(token):
+    """Numbers and reference codes (FT23010ABC12, 000012345) rather than names (bet9ja)."""
+    digits = sum(char.isdigit() for char in token)
+    return digits == len(token) or digits >= 4
+
+
+def canonicalize_description(description):
+    """
+    Canonical form of a transaction description: lowercase words with reference numbers,
+    dates, times and amounts removed, so "NIP TRF TO JOHN/FT23010ABC12 02-JAN-2023" and
+    "NIP TRF TO JOHN/FT23155XYZ90 15-MAR-2023" share "nip trf to john".
+    """
+    text = str(description or "").lower()
+    text = _DATE.sub(" ", text)
+    text = _TIME.sub(" ", text)
+    text = _AMOUNT.sub(" ", text)
+    tokens = [
+        token
+        for token in _NON_ALPHANUMERIC.split(text)
+        if token and not _is_reference(token)
+    ]
+    return " ".join(tokens)[:CANONICAL_MAX_LENGTH]
+
+
+def get_description_labels(canonicals):
+    """
+    {canonical: label} for the canonical descriptions the LLM already classified, in
+    one query. Only LLM labels are stored; local rules are re-applied on every run so
+    changes to them (e.g. a new merchant) take effect immediately.
+    """
+    return dict(
+        DescriptionLabel.objects.filter(canonical__in=set(canonicals)).values_list(
+            "canonical", "label"
+        )
+    )
+
+
+def save_description_labels(labels):
+    """
+    Store {canonical: label} results from the LLM, keeping any existing rows.
+    """
+    DescriptionLabel.objects.bulk_create(
+        [
+            DescriptionLabel(canonical=canonical, label=label)
+            for canonical, label in labels.items()
+        ],
+        ignore_conflicts=True,
+    )
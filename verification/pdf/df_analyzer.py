@@ -1,7 +1,12 @@
 import numpy as np
 import pandas as pd
 
-from verification.pdf.openai_chat import get_chat_response
+from verification.pdf.amount_utils import ARROW_STRING, parse_flows, to_arrow_strings
+from verification.pdf.date_utils import parse_date_column
+from verification.pdf.descriptions import canonicalize_description
+from verification.pdf.gambling import detect_gambling
+from verification.pdf.metrics import compute_affordability_metrics
+from verification.pdf.recurring import detect_recurring_payments
 
 
 class TransactionSummary:
@@ -14,43 +19,34 @@ class TransactionSummary:
         self._prepare_data()
 
     def _prepare_data(self):
-        # Ensure 'Date' is in datetime format
-        self.df["Date"] = pd.to_datetime(
-            self.df["Date"], errors="coerce", dayfirst=True
-        ).ffill()
-
-        # Convert 'Credit' and 'Debit' to numeric, handling any non-numeric issues
-        self.df["Credit"] = pd.to_numeric(
-            self.df["Credit"].str.replace(",", ""), errors="coerce"
-        ).fillna(0)
-        self.df["Debit"] = pd.to_numeric(
-            self.df["Debit"].str.replace(",", ""), errors="coerce"
-        ).fillna(0)
+        # Ensure 'Date' is in datetime format: one explicit format inferred for the
+        # column, with the memoized DateValidator for anything that does not fit it
+        self.df["Date"] = parse_date_column(self.df["Date"]).ffill()
 
-    def check_gambling_activities(self):
-        # Convert the 'Description' column to a list
-        descriptions_list = self.df["Description"].tolist()
+        self.df["Description"] = to_arrow_strings(self.df["Description"]).fillna("")
 
-        # Create a dictionary with index as key and description as value
-        description_dict = {
-            index: description for index, description in enumerate(descriptions_list)
-        }
+        # Descriptions without reference numbers, dates and amounts, shared by the
+        # description classifiers
+        self.df["Canonical"] = self.df["Description"].map(canonicalize_description)
+        self.df["Canonical"] = self.df["Canonical"].astype(ARROW_STRING)
 
-        # Convert the dictionary to a string
-        description_str = str(description_dict)
+        # Convert 'Credit' and 'Debit' to inflow and outflow amounts; a negative credit
+        # such as (500.00) is a reversal and moves to Debit
+        self.df["Credit"], self.df["Debit"] = parse_flows(
+            self.df["Credit"], self.df["Debit"]
+        )
 
-        example_structure = {
-            "gambling": True,
-            "area_found": [
-                {"index": 23, "description": "Gambling ticket"},
-                {"index": 30, "description": "Gambling ticket"},
-                # more description and index here
-            ],
-        }
-        instruction = "Get the index and description text of all transactions that shows gambling activites from the list of the transactions. If none exist, return False and an empty list"
-        response = get_chat_response(instruction, description_str, example_structure)
+    def check_gambling_activities(self):
+        # Known betting merchants are matched locally, the LLM only sees ambiguous rows
+        return detect_gambling(
+            self.df["Description"].tolist(), self.df["Canonical"].tolist()
+        )
 
-        return response
+    def generate_affordability_metrics(self, windows=None):
+        return compute_affordability_metrics(self.df, windows)
+
+    def detect_recurring_payments(self):
+        return detect_recurring_payments(self.df)
 
     def filter_last_six_months(self):
         six_months_ago = pd.Timestamp.now() - pd.DateOffset(months=6)
@@ -66,13 +62,14 @@ class TransactionSummary:
                 ]
             )
             .agg(Income=("Credit", "sum"), Expenses=("Debit", "sum"))
+            .round(2)
             .reset_index()
         )
 
         # Calculate Savings and Savings Ratio
         monthly_summary["Savings"] = (
             monthly_summary["Income"] - monthly_summary["Expenses"]
-        )
+        ).round(2)
         monthly_summary["Savings_Ratio"] = np.where(
             monthly_summary["Income"] > 0,
             (monthly_summary["Savings"] / monthly_summary["Income"]) * 100,
@@ -84,9 +81,10 @@ class TransactionSummary:
             lambda x: pd.to_datetime(x, format="%m").strftime("%B")
         )
 
-        total_income = monthly_summary["Income"].sum()
-        total_expenses = monthly_summary["Expenses"].sum()
-        total_savings = monthly_summary["Savings"].sum()
+        # Float sums drift (0.1 + 0.2), so money totals are rounded where they are added
+        total_income = round(monthly_summary["Income"].sum(), 2)
+        total_expenses = round(monthly_summary["Expenses"].sum(), 2)
+        total_savings = round(monthly_summary["Savings"].sum(), 2)
 
         if np.isnan(total_income) or np.isnan(total_savings):
             print("NaN encountered in totals. Adjusting...")
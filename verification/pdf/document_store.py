@@ -0,0 +1,239 @@
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+
+from bankanalysis.configs.logging_config import configure_logger
+from helpers.http_client import get_http_client
+
+logger = configure_logger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class DocumentTooLargeError(Exception):
+    """Raised when a document exceeds the configured maximum download size."""
+
+
+class DocumentStore:
+    """
+    Content-addressed, size-bounded local cache of downloaded documents.
+
+    Documents are stored on disk under the SHA-256 digest of their content and a small
+    URL index maps every source URL to that digest, so each stage of an analysis run (and
+    any later run for the same file) reads the local copy instead of downloading it again.
+    When the cache grows past `max_bytes` the least recently used documents are evicted.
+    """
+
+    def __init__(self, root, max_bytes, max_download_bytes=None, download_timeout=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_download_bytes = max_download_bytes
+        self.download_timeout = download_timeout
+        self.blob_dir = os.path.join(root, "blobs")
+        self.url_dir = os.path.join(root, "urls")
+        self._lock = threading.Lock()
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.url_dir, exist_ok=True)
+
+    def blob_path(self, content_hash):
+        return os.path.join(self.blob_dir, f"{content_hash}.pdf")
+
+    def _url_index_path(self, url):
+        url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.url_dir, url_key)
+
+    def _touch(self, path):
+        # Eviction is ordered by mtime, so bump it on every hit
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def lookup(self, url):
+        """Returns the content hash cached for a URL, or None on a miss."""
+        try:
+            with open(self._url_index_path(url), "r") as index_file:
+                content_hash = index_file.read().strip()
+        except FileNotFoundError:
+            return None
+
+        path = self.blob_path(content_hash)
+        if not os.path.exists(path):
+            return None
+
+        self._touch(path)
+        return content_hash
+
+    def read(self, content_hash):
+        with open(self.blob_path(content_hash), "rb") as blob:
+            return blob.read()
+
+    def map(self, content_hash):
+        """
+        Memory-maps a stored document read-only and returns a memoryview over it.
+
+        fitz.open(stream=...) accepts the memoryview directly, so the PDF is paged in from
+        the cache file on demand instead of being copied onto the heap.
+        """
+        with open(self.blob_path(content_hash), "rb") as blob:
+            mapped = mmap.mmap(blob.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped)
+
+    @contextmanager
+    def pinned_path(self, content_hash):
+        """
+        A private path to a stored document that stays valid even if the blob is evicted,
+        for readers that open the file by name (such as extraction worker processes).
+
+        The path is a hard link to the blob (a copy where links are not supported) in a
+        temporary directory under the cache root, removed again on exit.
+        """
+        run_dir = tempfile.mkdtemp(prefix="pinned-", dir=self.root)
+        path = os.path.join(run_dir, f"{content_hash}.pdf")
+        try:
+            try:
+                os.link(self.blob_path(content_hash), path)
+            except OSError:
+                shutil.copyfile(self.blob_path(content_hash), path)
+            yield path
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    def download(self, url):
+        """
+        Streams a document into the cache in chunks and returns its content hash.
+
+        The body is hashed while it is written to a temporary file next to the blobs, so it
+        is never held in memory. Downloads larger than max_download_bytes or slower than
+        download_timeout seconds in total are aborted.
+        """
+        timeout = self.download_timeout
+        deadline = time.monotonic() + timeout if timeout else None
+
+        http_client = get_http_client()
+        # Without an overall deadline the client's default socket timeouts still apply
+        request_kwargs = {"stream": True}
+        if timeout:
+            request_kwargs["timeout"] = (http_client.timeout[0], timeout)
+        with http_client.get(url, **request_kwargs) as response:
+            response.raise_for_status()  # Raises an HTTPError if the response was an error
+
+            content_length = response.headers.get("Content-Length")
+            if (
+                self.max_download_bytes
+                and content_length
+                and content_length.isdigit()
+                and int(content_length) > self.max_download_bytes
+            ):
+                raise DocumentTooLargeError(
+                    f"Document at {url} is {content_length} bytes, the limit is {self.max_download_bytes}"
+                )
+
+            digest = hashlib.sha256()
+            size = 0
+            fd, tmp_path = tempfile.mkstemp(dir=self.blob_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as tmp_file:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if self.max_download_bytes and size > self.max_download_bytes:
+                            raise DocumentTooLargeError(
+                                f"Document at {url} exceeds the limit of {self.max_download_bytes} bytes"
+                            )
+                        if deadline and time.monotonic() > deadline:
+                            raise requests.Timeout(
+                                f"Downloading {url} took longer than {timeout} seconds"
+                            )
+                        digest.update(chunk)
+                        tmp_file.write(chunk)
+
+                content_hash = digest.hexdigest()
+                path = self.blob_path(content_hash)
+                if os.path.exists(path):
+                    os.remove(tmp_path)
+                    self._touch(path)
+                else:
+                    os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        self._write_atomic(self._url_index_path(url), content_hash.encode("utf-8"))
+        self.evict(keep=content_hash)
+        return content_hash
+
+    def fetch(self, url):
+        """Returns the content hash for a URL, downloading the document only on a miss."""
+        content_hash = self.lookup(url)
+        if content_hash is not None:
+            logger.info(f"Document cache hit for {url} ({content_hash})")
+            return content_hash
+
+        logger.info(f"Document cache miss for {url}, downloading")
+        return self.download(url)
+
+    def evict(self, keep=None):
+        """Removes least recently used documents until the cache fits in max_bytes."""
+        with self._lock:
+            blobs = []
+            total_size = 0
+            for entry in os.scandir(self.blob_dir):
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+                total_size += stat.st_size
+
+            if total_size <= self.max_bytes:
+                return
+
+            for _, size, path, name in sorted(blobs):
+                if total_size <= self.max_bytes:
+                    break
+                if keep and name == f"{keep}.pdf":
+                    continue
+                try:
+                    os.remove(path)
+                    total_size -= size
+                except FileNotFoundError:
+                    continue
+
+
+_document_store = None
+
+
+def get_document_store():
+    """Returns the process-wide DocumentStore configured from settings."""
+    global _document_store
+    if _document_store is None:
+        _document_store = DocumentStore(
+            root=settings.PDF_CACHE_DIR,
+            max_bytes=settings.PDF_CACHE_MAX_BYTES,
+            max_download_bytes=settings.PDF_DOWNLOAD_MAX_BYTES,
+            download_timeout=settings.PDF_DOWNLOAD_TIMEOUT,
+        )
+    return _document_store
@@ -0,0 +1,275 @@
+import asyncio
+import re
+from collections import deque
+
+from django.conf import settings
+
+from bankanalysis.configs.logging_config import configure_logger
+from verification.pdf.descriptions import (
+    canonicalize_description,
+    get_description_labels,
+    save_description_labels,
+)
+from verification.pdf.openai_chat import aget_chat_response
+
+logger = configure_logger(__name__)
+
+# Betting and gaming merchants seen on Nigerian statements. A merchant is recognised when
+# it is one word of the description or several adjacent words written together (so
+# "SPORTY BET", "Sporty-Bet" and "SPORTYBET/NIP" all match "sportybet"), but not inside
+# other words ("SMS PORTAL" does not match "msport")
+GAMBLING_MERCHANTS = [
+    "bet9ja",
+    "sportybet",
+    "nairabet",
+    "1xbet",
+    "betking",
+    "merrybet",
+    "betway",
+    "msport",
+    "bangbet",
+    "accessbet",
+    "betbonanza",
+    "surebet247",
+    "22bet",
+    "melbet",
+    "betano",
+    "paripesa",
+    "livescorebet",
+    "naijabet",
+    "supabets",
+    "betwinner",
+    "frapapa",
+    "betland",
+    "lionsbet",
+    "winnersgoldenbet",
+    "premierbet",
+    "wazobet",
+    "cloudbet",
+    "babaijebu",
+    "premierlotto",
+    "greenlotto",
+    "lottonownow",
+    "westernlotto",
+]
+
+# Whole words that suggest, but do not prove, gambling. Descriptions containing one of
+# them and no known merchant are left to the LLM
+GAMBLING_HINTS = {
+    "bet",
+    "bets",
+    "betting",
+    "wager",
+    "stake",
+    "casino",
+    "poker",
+    "slots",
+    "jackpot",
+    "lotto",
+    "lottery",
+    "odds",
+    "punter",
+    "virtuals",
+}
+
+LLM_INSTRUCTION = "Get the index and description text of all transactions that shows gambling activites from the list of the transactions. If none exist, return False and an empty list"
+LLM_EXAMPLE_STRUCTURE = {
+    "gambling": True,
+    "area_found": [
+        {"index": 23, "description": "Gambling ticket"},
+        {"index": 30, "description": "Gambling ticket"},
+        # more description and index here
+    ],
+}
+
+GAMBLING = "gambling"
+NOT_GAMBLING = "not_gambling"
+UNRESOLVED = "unresolved"
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+class PatternAutomaton:
+    """Aho-Corasick automaton reporting which of a fixed set of patterns occur in a text."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].add(pattern)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def find(self, text):
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            found |= self.output[state]
+        return found
+
+
+_merchant_automaton = PatternAutomaton(GAMBLING_MERCHANTS)
+_merchant_names = frozenset(GAMBLING_MERCHANTS)
+_longest_merchant = max(len(merchant) for merchant in GAMBLING_MERCHANTS)
+
+
+def normalize_description(description):
+    """Lowercase words of a description with punctuation and separators removed."""
+    return _NON_ALPHANUMERIC.sub(" ", str(description or "").lower()).strip()
+
+
+def _has_merchant_words(words):
+    """Whether a merchant name is one of the words or several adjacent words joined."""
+    for start in range(len(words)):
+        joined = ""
+        for word in words[start:]:
+            joined += word
+            if len(joined) > _longest_merchant:
+                break
+            if joined in _merchant_names:
+                return True
+    return False
+
+
+def classify_description(description):
+    """
+    GAMBLING, NOT_GAMBLING or UNRESOLVED (needs the LLM) for one description.
+
+    Only a merchant name on word boundaries is proof of gambling. A merchant name that
+    merely occurs inside the text ("SMS PORTAL" contains "msport"), like a gambling
+    hint word, leaves the description to the LLM.
+    """
+    normalized = normalize_description(description)
+    words = normalized.split()
+    if _has_merchant_words(words):
+        return GAMBLING
+    if _merchant_automaton.find(normalized.replace(" ", "")):
+        return UNRESOLVED
+    if GAMBLING_HINTS.isdisjoint(words):
+        return NOT_GAMBLING
+    return UNRESOLVED
+
+
+async def _classify_chunk(semaphore, chunk):
+    async with semaphore:
+        response = await aget_chat_response(
+            LLM_INSTRUCTION,
+            str(chunk),
+            LLM_EXAMPLE_STRUCTURE,
+            call_site="gambling_check",
+        )
+
+    found = set()
+    for area in response.get("area_found") or []:
+        try:
+            index = int(area["index"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if index in chunk:
+            found.add(index)
+    return found
+
+
+async def _classify_with_llm(unresolved):
+    """Keys of the unresolved {index: description} items the LLM flags as gambling."""
+    chunk_size = max(1, settings.GAMBLING_LLM_CHUNK_SIZE)
+    items = list(unresolved.items())
+    chunks = [
+        dict(items[start : start + chunk_size])
+        for start in range(0, len(items), chunk_size)
+    ]
+
+    semaphore = asyncio.Semaphore(max(1, settings.GAMBLING_LLM_CONCURRENCY))
+    results = await asyncio.gather(
+        *(_classify_chunk(semaphore, chunk) for chunk in chunks)
+    )
+    return set().union(*results)
+
+
+def detect_gambling(descriptions, canonicals=None):
+    """
+    Finds gambling transactions in a list of descriptions.
+
+    Descriptions are canonicalized and deduplicated. Known betting merchants are flagged
+    locally and descriptions without any gambling hint are cleared locally; of the
+    rest, those the LLM already labelled are fetched in one query and only the others
+    are sent to the LLM, in chunks of GAMBLING_LLM_CHUNK_SIZE and concurrently. The
+    LLM's labels are stored for later statements. Returns
+    {"gambling": bool, "area_found": [{"index", "description"}]} with indices into
+    `descriptions`. Precomputed canonical forms can be passed in `canonicals`.
+    """
+    if canonicals is None:
+        canonicals = [
+            canonicalize_description(description) for description in descriptions
+        ]
+
+    labels = {}
+    unresolved = {}  # canonical -> first description with that canonical form
+    for description, canonical in zip(descriptions, canonicals):
+        if canonical in labels or canonical in unresolved:
+            continue
+        label = classify_description(canonical)
+        if label == UNRESOLVED:
+            unresolved[canonical] = description
+        else:
+            labels[canonical] = label
+    classified_locally = len(labels)
+
+    known = get_description_labels(unresolved)
+    labels.update(known)
+    pending = [
+        (canonical, description)
+        for canonical, description in unresolved.items()
+        if canonical not in known
+    ]
+
+    logger.info(
+        f"Gambling check: {len(descriptions)} descriptions, {classified_locally} "
+        f"classified locally, {len(known)} known, {len(pending)} sent to the LLM"
+    )
+    if pending:
+        flagged = asyncio.run(
+            _classify_with_llm(
+                {
+                    position: description
+                    for position, (_, description) in enumerate(pending)
+                }
+            )
+        )
+        new_labels = {
+            canonical: GAMBLING if position in flagged else NOT_GAMBLING
+            for position, (canonical, _) in enumerate(pending)
+        }
+        save_description_labels(new_labels)
+        labels.update(new_labels)
+
+    return {
+        "gambling": any(labels[canonical] == GAMBLING for canonical in canonicals),
+        "area_found": [
+            {"index": index, "description": descriptions[index]}
+            for index, canonical in enumerate(canonicals)
+            if labels[canonical] == GAMBLING
+        ],
+    }
@@ -6,11 +6,11 @@ class GridDefiner:
 
     @staticmethod
     def find_stride_and_first_last_date_indices(
-        data, start_index_for_searching, stride_step=None
+        spans, start_index_for_searching, stride_step=None
     ):
         first_date_index = None
-        for i in range(start_index_for_searching, len(data)):
-            if DateValidator.is_valid_date(data[i]["text"]):
+        for i in range(start_index_for_searching, len(spans)):
+            if DateValidator.is_valid_date(spans.text[i]):
                 first_date_index = i
                 break
 
@@ -19,8 +19,8 @@ class GridDefiner:
 
         # the stride should be used from the openai vision response
         stride = None
-        for i in range(first_date_index + 1, len(data)):
-            if DateValidator.is_valid_date(data[i]["text"]):
+        for i in range(first_date_index + 1, len(spans)):
+            if DateValidator.is_valid_date(spans.text[i]):
                 stride = i - first_date_index
                 break
 
@@ -28,8 +28,8 @@ class GridDefiner:
             return None, first_date_index, None
 
         last_date_index = first_date_index
-        for i in range(first_date_index, len(data), stride):
-            if DateValidator.is_valid_date(data[i]["text"]):
+        for i in range(first_date_index, len(spans), stride):
+            if DateValidator.is_valid_date(spans.text[i]):
                 last_date_index = i
             else:
                 break
@@ -42,13 +42,13 @@ class GridDefiner:
 
     @staticmethod
     def define_grid(
-        text_blocks, first_date_index, stride, last_date_index, headers, header_columns
+        spans, first_date_index, stride, last_date_index, headers, header_columns
     ):
         """
         Define the grid based on date entries and their stride in the text blocks, adjusting column widths and positions based on specific rules.
 
         Parameters:
-        - text_blocks: List of dictionaries with text block details.
+        - spans: PageSpans with the text spans of the page.
         - first_date_index: Index of the first date entry in the text blocks.
         - stride: The stride between consecutive date entries.
         - last_date_index: Index of the last date entry in the text blocks.
@@ -105,9 +105,7 @@ class GridDefiner:
 
         # Iterate over the date entries using the first index, stride, and last index
         for i in range(first_date_index, last_date_index + 1, stride):
-            text_block = text_blocks[i]
-            row_top = text_block["bbox"][1]
-            row_bottom = text_block["bbox"][3]
+            _, row_top, _, row_bottom = spans.bbox(i)
 
             grid_row = []
             for header_name, header_info in sorted_headers:
@@ -116,20 +114,14 @@ class GridDefiner:
 
                 if header_name == header_columns[0]:
                     # Use second row for Date column right boundary adjustment
-                    next_row_block_start_index = text_blocks[second_row_date_index]
-                    column_left = next_row_block_start_index["bbox"][0]
+                    column_left = spans.bbox(second_row_date_index)[0]
                     column_right = (
-                        text_blocks[second_row_date_index + 1]["bbox"][0] - 0.0000000001
+                        spans.bbox(second_row_date_index + 1)[0] - 0.0000000001
                     )  # Left boundary of next column
                 elif header_name == header_columns[1]:
                     # Use second row for Transaction Details column, adjusting right boundary as needed
-                    next_row_trans_start_block = text_blocks[
-                        second_row_transaction_index
-                    ]
-                    column_left = next_row_trans_start_block["bbox"][0]
-                    column_right = (
-                        text_blocks[second_row_transaction_index + 1]["bbox"][2] - 2
-                    )
+                    column_left = spans.bbox(second_row_transaction_index)[0]
+                    column_right = spans.bbox(second_row_transaction_index + 1)[2] - 2
                 elif header_name == header_columns[2]:
                     column_left, column_right = credit_bbox[0], credit_bbox[2]
 
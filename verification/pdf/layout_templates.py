@@ -0,0 +1,123 @@
+import hashlib
+import json
+
+import numpy as np
+from django.db.models import F
+
+from bankanalysis.configs.logging_config import configure_logger
+from verification.models import LayoutTemplate
+
+logger = configure_logger(__name__)
+
+# How far (in points) a header may drift horizontally from the template and still match
+HEADER_X_TOLERANCE = 3.0
+
+
+def bank_fingerprint(document):
+    """
+    Fingerprint of the bank that produced a statement, from the PDF metadata, the fonts
+    used on the first page and the page size. Statements from the same bank and
+    statement generator share it; customer-specific text does not affect it.
+    """
+    metadata = document.metadata or {}
+    first_page = document[0]
+
+    fonts = set()
+    for font in first_page.get_fonts():
+        basefont = font[3]
+        # Drop the random subset prefix, e.g. "ABCDEF+ArialMT"
+        fonts.add(basefont.split("+", 1)[-1])
+
+    signature = {
+        "producer": metadata.get("producer", ""),
+        "creator": metadata.get("creator", ""),
+        "fonts": sorted(fonts),
+        "size": [round(first_page.rect.width), round(first_page.rect.height)],
+    }
+    return hashlib.sha256(
+        json.dumps(signature, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def locate_template_headers(spans, template_headers):
+    """
+    Find the template's header spans on a page without fuzzy matching.
+
+    A header matches the first span with the same (case-insensitive) text whose left edge
+    is within HEADER_X_TOLERANCE of the stored one; its vertical position may differ from
+    page to page. Returns header bboxes in the TableHeaderFinder format, or None if any
+    header is missing.
+    """
+    texts = np.array([text.strip().lower() for text in spans.text], dtype=object)
+    header_bboxes = {}
+
+    for target, header in template_headers.items():
+        candidates = np.flatnonzero(
+            (texts == header["text"].strip().lower())
+            & (np.abs(spans.x0 - header["bbox"][0]) <= HEADER_X_TOLERANCE)
+        )
+        if not len(candidates):
+            return None
+
+        position = candidates[0]
+        header_bboxes[target] = {
+            "bbox": spans.bbox(position),
+            "index": int(spans.index[position]),
+        }
+
+    return header_bboxes
+
+
+def find_layout_template(fingerprint, first_page_spans):
+    """
+    Returns the stored template for a fingerprint if its headers are found on the first
+    page of the statement, otherwise None.
+    """
+    template = LayoutTemplate.objects.filter(fingerprint=fingerprint).first()
+    if template is None:
+        return None
+
+    if locate_template_headers(first_page_spans, template.header_bboxes) is None:
+        logger.info(f"Layout template {fingerprint} did not validate, ignoring it")
+        return None
+
+    LayoutTemplate.objects.filter(pk=template.pk).update(hits=F("hits") + 1)
+    logger.info(f"Using layout template {fingerprint}")
+    return template
+
+
+def get_layout_template(fingerprint):
+    if fingerprint is None:
+        return None
+    return LayoutTemplate.objects.filter(fingerprint=fingerprint).first()
+
+
+def save_layout_template(
+    fingerprint, header_columns, target_columns, spans, header_bboxes, stride
+):
+    """
+    Learn (or refresh) the template for a fingerprint from a successfully parsed page.
+
+    Only the headers and the stride are reused; the grid is still defined per page from
+    the located headers, since column positions shift with the header row.
+    """
+    template_headers = {
+        target: {
+            "text": spans.text[header["index"]],
+            "bbox": list(header["bbox"]),
+            "index": header["index"],
+        }
+        for target, header in header_bboxes.items()
+    }
+
+    template, _ = LayoutTemplate.objects.update_or_create(
+        fingerprint=fingerprint,
+        defaults={
+            "header_columns": header_columns,
+            "target_columns": target_columns,
+            "header_bboxes": template_headers,
+            "stride": stride,
+        },
+    )
+    logger.info(f"Saved layout template {fingerprint}")
+    return template
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from bankanalysis.configs.logging_config import configure_logger
+from helpers.llm_backend import RECORD, request_key
+
+logger = configure_logger(__name__)
+
+KEY_PREFIX = "llm-response"
+
+
+class LLMCacheMetrics:
+    """Thread-safe, in-process hit/miss counters for cached LLM calls, by call site."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.call_sites = {}
+
+    def record(self, call_site, outcome):
+        with self._lock:
+            stats = self.call_sites.setdefault(
+                call_site, {"local_hits": 0, "shared_hits": 0, "misses": 0}
+            )
+            stats[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                call_site: {
+                    **stats,
+                    "hit_rate": (
+                        (stats["local_hits"] + stats["shared_hits"])
+                        / (stats["local_hits"] + stats["shared_hits"] + stats["misses"])
+                    ),
+                }
+                for call_site, stats in self.call_sites.items()
+            }
+
+
+class LocalLRU:
+    """A small thread-safe LRU mapping whose entries expire after a TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class LLMResponseCache:
+    """
+    Cache of raw completion contents keyed by a hash of the request.
+
+    The key covers the model, the messages (and so any image payload they carry), the
+    response format and every other request parameter, so only byte-identical prompts
+    share an entry. Lookups go to the in-process LRU first and then to the shared Django
+    cache alias (database or Redis) if one is configured; shared hits are copied into
+    the LRU.
+    """
+
+    def __init__(self, local_maxsize, ttl, cache_alias=None):
+        self.ttl = ttl
+        self.local = LocalLRU(local_maxsize, ttl)
+        self.cache_alias = cache_alias
+        self.metrics = LLMCacheMetrics()
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    @staticmethod
+    def make_key(request):
+        return f"{KEY_PREFIX}:{request_key(request)}"
+
+    def get(self, call_site, key):
+        content = self.local.get(key)
+        if content is not None:
+            self.metrics.record(call_site, "local_hits")
+            return content
+
+        if self.shared is not None:
+            try:
+                content = self.shared.get(key)
+            except Exception as e:
+                logger.warning(f"LLM cache lookup failed: {e}")
+            if content is not None:
+                self.local.set(key, content)
+                self.metrics.record(call_site, "shared_hits")
+                return content
+
+        self.metrics.record(call_site, "misses")
+        return None
+
+    def set(self, key, content):
+        self.local.set(key, content)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, content, timeout=self.ttl)
+            except Exception as e:
+                logger.warning(f"LLM cache store failed: {e}")
+
+
+_llm_cache = None
+
+
+def get_llm_cache():
+    """
+    The process-wide LLM response cache, or None when it is disabled. It is also off
+    while recording a cassette, since cache hits would never reach the recorder.
+    """
+    global _llm_cache
+    if not settings.LLM_CACHE_ENABLED or settings.LLM_BACKEND_MODE == RECORD:
+        return None
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            local_maxsize=settings.LLM_CACHE_LOCAL_MAXSIZE,
+            ttl=settings.LLM_CACHE_TTL,
+            cache_alias=settings.LLM_CACHE_ALIAS or None,
+        )
+    return _llm_cache
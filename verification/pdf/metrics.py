@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+
+def _round(value, digits=2):
+    return round(float(value), digits)
+
+
+def _aggregate(df):
+    """
+    Daily and monthly aggregates of a transaction frame, the only pass over its rows.
+
+    Monthly figures are rolled up from the daily ones and cover every calendar month
+    between the first and last transaction, so months without activity count as zero.
+    """
+    frame = df.loc[df["Date"].notna(), ["Date", "Credit", "Debit"]]
+    daily = frame.groupby(frame["Date"].dt.normalize()).agg(
+        credit=("Credit", "sum"),
+        debit=("Debit", "sum"),
+        largest_credit=("Credit", "max"),
+    )
+    daily["net"] = daily["credit"] - daily["debit"]
+
+    monthly = daily.groupby(daily.index.to_period("M")).agg(
+        income=("credit", "sum"),
+        expenses=("debit", "sum"),
+        largest_credit=("largest_credit", "max"),
+    )
+    monthly = monthly.reindex(
+        pd.period_range(monthly.index.min(), monthly.index.max(), freq="M"),
+        fill_value=0.0,
+    )
+    monthly["net"] = monthly["income"] - monthly["expenses"]
+    # Running net flow since the start of the statement, as at each month end
+    monthly["closing_proxy"] = monthly["net"].cumsum()
+    return daily, monthly
+
+
+def _window_metrics(daily, monthly, months):
+    recent = monthly.iloc[-months:]
+    recent_days = daily[daily.index >= recent.index[0].start_time]
+
+    income = recent["income"].to_numpy()
+    total_income = income.sum()
+    mean_income = income.mean()
+    net = recent["net"].to_numpy()
+
+    return {
+        "months_covered": len(recent),
+        "median_monthly_income": _round(np.median(income)),
+        # Coefficient of variation of monthly income (0 = perfectly steady)
+        "income_volatility": _round(
+            income.std() / mean_income if mean_income else 0, digits=4
+        ),
+        "largest_inflow_share": _round(
+            recent["largest_credit"].max() / total_income if total_income else 0,
+            digits=4,
+        ),
+        "average_month_end_balance_proxy": _round(recent["closing_proxy"].mean()),
+        # Least-squares slope of monthly net flow, in naira per month
+        "net_flow_trend": _round(
+            np.polyfit(np.arange(len(net)), net, 1)[0] if len(net) > 1 else 0
+        ),
+        "days_with_negative_net_flow": int((recent_days["net"] < 0).sum()),
+    }
+
+
+def compute_affordability_metrics(df, windows=None):
+    """
+    Affordability metrics over the last N months of a transaction frame for each N in
+    `windows` (AFFORDABILITY_WINDOWS by default), keyed "3_months", "6_months", ...
+
+    Windows end at the month of the latest transaction rather than today, so older
+    statements are measured over the period they actually cover. The frame is
+    aggregated once; every window and metric is computed from those aggregates.
+    """
+    windows = windows or settings.AFFORDABILITY_WINDOWS
+    if not df["Date"].notna().any():
+        return {f"{months}_months": None for months in windows}
+
+    daily, monthly = _aggregate(df)
+    return {
+        f"{months}_months": _window_metrics(daily, monthly, months)
+        for months in windows
+    }
@@ -0,0 +1,106 @@
+import re
+
+from django.conf import settings
+
+from bankanalysis.configs.logging_config import configure_logger
+from verification.pdf.column_resolver import (
+    OPTIONAL_COLUMNS,
+    REQUIRED_COLUMNS,
+    resolve_headers,
+    score_column,
+)
+
+logger = configure_logger(__name__)
+
+# Summary rows that are not transactions
+BALANCE_ROW_PATTERN = re.compile(
+    r"\b(?:opening|closing)\s+balance\b|\bbalance\s+(?:brought|carried)\s+forward\b"
+    r"|\b(?:brought|carried)\s+forward\b|\bbal(?:ance)?\s*[bc]\s*/\s*f\b",
+    re.IGNORECASE,
+)
+
+
+def resolve_columns(names):
+    """
+    Maps the column names of a vision table to REQUIRED_COLUMNS and OPTIONAL_COLUMNS.
+    Returns ({column: source name}, [required columns that could not be resolved]).
+    """
+    mapping, _ = resolve_headers(list(names), REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
+    resolved = {
+        column: mapping[column]
+        for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+        if column in mapping
+        and score_column(mapping[column], column) >= settings.COLUMN_RESOLVER_THRESHOLD
+    }
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in resolved]
+    return resolved, missing
+
+
+def _as_columns(page_data):
+    """
+    The vision JSON as {column name: list of values}. Besides that layout the model
+    sometimes returns a list of row objects, possibly wrapped in a single key.
+    """
+    if isinstance(page_data, dict) and len(page_data) == 1:
+        (value,) = page_data.values()
+        if isinstance(value, list) and all(isinstance(row, dict) for row in value):
+            page_data = value
+
+    if isinstance(page_data, list):
+        columns = {}
+        for position, row in enumerate(page_data):
+            if not isinstance(row, dict):
+                return None
+            for name, value in row.items():
+                columns.setdefault(name, [None] * position).append(value)
+            for values in columns.values():
+                values.extend([None] * (position + 1 - len(values)))
+        return columns
+
+    if isinstance(page_data, dict) and all(
+        isinstance(values, list) for values in page_data.values()
+    ):
+        return page_data
+    return None
+
+
+def is_balance_row(*cells):
+    return any(
+        isinstance(cell, str) and BALANCE_ROW_PATTERN.search(cell) for cell in cells
+    )
+
+
+def normalize_vision_page(page_data):
+    """
+    Deterministic replacement for the refine_data LLM pass over one page of vision JSON.
+
+    Renames the columns with the column resolver, checks that every resolved column has
+    the same number of values and drops opening/closing balance rows. Returns
+    {"Date", "Description", "Credit", "Debit"[, "Balance"]: list}, or None when a
+    required column cannot be resolved or the columns do not line up, in which case
+    the page should be refined by the LLM.
+    """
+    columns = _as_columns(page_data)
+    if columns is None:
+        logger.info("Vision page has an unexpected layout, refining with the LLM")
+        return None
+
+    resolved, missing = resolve_columns(columns)
+    if missing:
+        logger.info(f"Unresolved vision columns {missing} in {list(columns)}")
+        return None
+
+    lengths = {len(columns[name]) for name in resolved.values()}
+    if len(lengths) != 1:
+        logger.info(f"Vision columns have different lengths {sorted(lengths)}")
+        return None
+
+    normalized = {column: [] for column in resolved}
+    for row in zip(*(columns[name] for name in resolved.values())):
+        cells = dict(zip(resolved, row))
+        if is_balance_row(cells["Date"], cells["Description"]):
+            continue
+        for column, value in cells.items():
+            normalized[column].append(value)
+    return normalized
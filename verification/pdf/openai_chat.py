@@ -1,13 +1,56 @@
+import asyncio
 import json
 import logging
 import time
 
-from django.conf import settings
-from langchain.schema import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-from openai import AsyncOpenAI
+from helpers.llm_backend import get_llm_backend
+from verification.pdf.llm_cache import get_llm_cache
 
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+def parse_json_content(content):
+    # Extract JSON data from the response and remove Markdown formatting
+    json_string = content.replace("```json\n", "").replace("\n```", "")
+    return json.loads(json_string)
+
+
+def create_completion(call_site, parse, **request):
+    """
+    Chat completion through the prompt cache and the configured LLM backend. The raw
+    content is only cached once parse() accepts it, so a malformed response is never
+    served again on retry.
+    """
+    cache = get_llm_cache()
+    key = cache.make_key(request) if cache is not None else None
+    content = cache.get(call_site, key) if cache is not None else None
+
+    if content is None:
+        response = get_llm_backend().chat_completion(**request)
+        content = response["choices"][0]["message"]["content"]
+        result = parse(content)
+        if cache is not None:
+            cache.set(key, content)
+        return result
+
+    return parse(content)
+
+
+async def acreate_completion(call_site, parse, **request):
+    """Async counterpart of create_completion."""
+    cache = get_llm_cache()
+    key = cache.make_key(request) if cache is not None else None
+    content = None
+    if cache is not None:
+        content = await asyncio.to_thread(cache.get, call_site, key)
+
+    if content is None:
+        response = await get_llm_backend().achat_completion(**request)
+        content = response["choices"][0]["message"]["content"]
+        result = parse(content)
+        if cache is not None:
+            await asyncio.to_thread(cache.set, key, content)
+        return result
+
+    return parse(content)
 
 
 def get_refined_instruction(instruction, example_structure, message_type=None):
@@ -18,43 +61,76 @@ def get_refined_instruction(instruction, example_structure, message_type=None):
     return structured_instruction
 
 
+def get_structured_messages(instruction, message, example_structure, message_type):
+    structured_instruction = get_refined_instruction(
+        instruction, example_structure, message_type=message_type
+    )
+    return [
+        {"role": "system", "content": structured_instruction},
+        {"role": "user", "content": message},
+    ]
+
+
 def get_chat_response(
-    instruction, message, example_structure=None, message_type="not_vision"
+    instruction,
+    message,
+    example_structure=None,
+    message_type="not_vision",
+    call_site="chat",
 ):
     start_time = time.time()
 
-    chat = ChatOpenAI(
-        temperature=0.7,
-        model_name="gpt-4-1106-preview",
-        openai_api_key=settings.OPENAI_API_KEY,
-    )
-
-    messages = [SystemMessage(content=instruction), HumanMessage(content=message)]
-
     if example_structure:
-        structured_instruction = get_refined_instruction(
-            instruction, example_structure, message_type=message_type
-        )
-
-        messages = [
-            {"role": "system", "content": structured_instruction},
-            {"role": "user", "content": message},
-        ]
-
-        structured_response = client.chat.completions.create(
+        response = create_completion(
+            call_site,
+            json.loads,
             model="gpt-4-1106-preview",
-            messages=messages,
+            messages=get_structured_messages(
+                instruction, message, example_structure, message_type
+            ),
             response_format={"type": "json_object"},
         )
 
-        response = json.loads(structured_response.choices[0].message.content)
-
         total = time.time() - start_time
         logging.info(f"Chat Response Time: {total}")
 
         return response
 
-    response = chat(messages).content
+    response = create_completion(
+        call_site,
+        str,
+        model="gpt-4-1106-preview",
+        messages=[
+            {"role": "system", "content": instruction},
+            {"role": "user", "content": message},
+        ],
+        temperature=0.7,
+    )
+    total = time.time() - start_time
+    logging.info(f"Chat Response Time: {total}")
+    return response
+
+
+async def aget_chat_response(
+    instruction,
+    message,
+    example_structure,
+    message_type="not_vision",
+    call_site="chat",
+):
+    """Async counterpart of get_chat_response for structured (JSON) responses."""
+    start_time = time.time()
+
+    response = await acreate_completion(
+        call_site,
+        json.loads,
+        model="gpt-4-1106-preview",
+        messages=get_structured_messages(
+            instruction, message, example_structure, message_type
+        ),
+        response_format={"type": "json_object"},
+    )
+
     total = time.time() - start_time
     logging.info(f"Chat Response Time: {total}")
     return response
@@ -82,6 +158,7 @@ def swap_columns(header_columns):
         message,
         example_structure=desired_format,
         message_type="for_vision",
+        call_site="swap_columns",
     )
 
     arranged_columns = chat_response["columns"]
@@ -89,8 +166,42 @@ def swap_columns(header_columns):
     return arranged_columns
 
 
+def match_header_columns(vision_columns):
+    desired_columns = {"columns": ["Date", "Description", "Credit", "Debit"]}
+
+    instruction = f"""Given two lists of column names for a transactions table, return a list of which columns in the second list correspond to the columns in \
+    the first list. Provide the matched column names from the second list in the same order as they appear in the first list.
+    """
+
+    message = f"""
+    LIST 1: 
+    {desired_columns["columns"]}
+    
+    list 2 which represent actual column names:
+    {vision_columns}
+
+    In your returned list, there has to be:
+    - a column for date of transaction
+    - a column for description of transaction
+    - a column for transaction credit
+    - a column for transaction debit
+    """
+
+    chat_response = get_chat_response(
+        instruction,
+        message,
+        example_structure=desired_columns,
+        message_type="for_vision",
+        call_site="header_mapping",
+    )
+
+    return chat_response["columns"]
+
+
 def get_vision_response(image_data_url, sample_columns):
-    response = client.chat.completions.create(
+    data = create_completion(
+        "vision_headers",
+        parse_json_content,
         model="gpt-4-vision-preview",
         messages=[
             {
@@ -110,54 +221,47 @@ def get_vision_response(image_data_url, sample_columns):
         max_tokens=300,
     )
 
-    # Extract JSON data from the response and remove Markdown formatting
-    json_string = response.choices[0].message.content
-    json_string = json_string.replace("```json\n", "").replace("\n```", "")
-    # print("This is json string: ", json_string)
-    data = json.loads(json_string)
-
     column_headers = data.get("columns", [])
 
     return column_headers
 
 
-def get_vision_data(image_data_url, sample_columns):
-    response = client.chat.completions.create(
+def get_vision_data_messages(image_data_url, sample_columns):
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": f"""Return JSON document of the transactions table using the sample format as a guide. Ensure you return only JSON not other text.\n\n
+                    
+                    SAMPLE FORMAT: 
+                    {sample_columns}.\nPlease follow the Date format of day-month-year""",
+                },
+                {"type": "image_url", "image_url": {"url": image_data_url}},
+            ],
+        }
+    ]
+
+
+async def aget_vision_data(image_data_url, sample_columns):
+    return await acreate_completion(
+        "vision_data",
+        parse_json_content,
         model="gpt-4-vision-preview",
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": f"""Return JSON document of the transactions table using the sample format as a guide. Ensure you return only JSON not other text.\n\n
-                        
-                        SAMPLE FORMAT: 
-                        {sample_columns}.\nPlease follow the Date format of day-month-year""",
-                    },
-                    {"type": "image_url", "image_url": {"url": image_data_url}},
-                ],
-            }
-        ],
+        messages=get_vision_data_messages(image_data_url, sample_columns),
         max_tokens=300,
     )
 
-    # Extract JSON data from the response and remove Markdown formatting
-    json_string = response.choices[0].message.content
-    json_string = json_string.replace("```json\n", "").replace("\n```", "")
-    print("This is the json string I am checking: ")
-    print(json_string)
-    data = json.loads(json_string)
-    return data
-
-
-def refine_data(vision_transaction_data, sample_columns):
-    instruction = f"""Given the transaction details, select the data of columns in the required columns from \
-        the entire set of transactions. Give you response in the required format. Ensure you remove Opening \
-        Balance and Closing Balance records in your response.
-    """
 
-    message = f"""
+REFINE_DATA_INSTRUCTION = f"""Given the transaction details, select the data of columns in the required columns from \
+    the entire set of transactions. Give you response in the required format. Ensure you remove Opening \
+    Balance and Closing Balance records in your response.
+"""
+
+
+def get_refine_data_message(vision_transaction_data):
+    return f"""
     TRANSACTION DETAILS:
     {vision_transaction_data}
     
@@ -165,21 +269,22 @@ def refine_data(vision_transaction_data, sample_columns):
     ["Date", "Description", "Credit", "Debit"]
     """
 
-    refined_data = get_chat_response(
-        instruction,
-        message,
+
+async def arefine_data(vision_transaction_data, sample_columns):
+    return await aget_chat_response(
+        REFINE_DATA_INSTRUCTION,
+        get_refine_data_message(vision_transaction_data),
         example_structure=sample_columns,
         message_type="not_vision",
+        call_site="refine_data",
     )
-    print("This is the refined data: ")
-    print(refined_data)
-
-    return refined_data
 
 
 def categorize_pdf(image_data_url, sample_columns):
 
-    response = client.chat.completions.create(
+    data = create_completion(
+        "categorize_pdf",
+        parse_json_content,
         model="gpt-4-vision-preview",
         messages=[
             {
@@ -213,13 +318,7 @@ def categorize_pdf(image_data_url, sample_columns):
         ],
         max_tokens=300,
     )
-
-    # Extract JSON data from the response and remove Markdown formatting
-    json_string = response.choices[0].message.content
-    json_string = json_string.replace("```json\n", "").replace("\n```", "")
-    # print("This is json string: ", json_string)
-    data = json.loads(json_string)
-    print(data)
     type = data.get("type", [])
+    logging.info(f"PDF category: {type}")
 
     return type
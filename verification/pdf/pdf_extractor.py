@@ -1,28 +1,88 @@
+import asyncio
 import base64
 import json
+import random
+from collections import OrderedDict, deque
 from io import BytesIO
 
+import billiard
 import fitz  # PyMuPDF
-import requests
+import numpy as np
+from django.conf import settings
 from fuzzywuzzy import process
-from pdf2image import convert_from_bytes, convert_from_path
+from PIL import Image
 
+from bankanalysis.configs.logging_config import configure_logger
+from verification.pdf.column_resolver import map_header_columns
+from verification.pdf.document_store import get_document_store
+from verification.pdf.normalizer import normalize_vision_page
 from verification.pdf.openai_chat import (
+    aget_vision_data,
+    arefine_data,
     categorize_pdf,
-    get_chat_response,
-    get_vision_data,
     get_vision_response,
-    refine_data,
 )
+from verification.pdf.spans import PageSpans
 
+logger = configure_logger(__name__)
 
-def pdf_url_to_images(pdf_url):
-    response = requests.get(pdf_url)
-    if response.status_code == 200:
-        images = convert_from_bytes(response.content)
-        return images  # This is a list of PIL.Image objects
-    else:
-        raise Exception("Failed to download PDF")
+
+class VisionExtractionError(Exception):
+    """A page could not be extracted by the vision model within its retry budget."""
+
+
+# Document opened once by each extraction pool worker, see PDFExtractor._map_pages
+_worker_document = None
+
+
+def _open_worker_document(pdf_path):
+    global _worker_document
+    _worker_document = fitz.open(pdf_path)
+
+
+def _map_page_range(page_func, start, stop):
+    return [
+        page_func(_worker_document[page_num], page_num)
+        for page_num in range(start, stop)
+    ]
+
+
+def _extract_page_text_blocks(page, page_num):
+    texts = []
+    bboxes = []
+
+    text_dict = page.get_text("dict")
+    blocks = text_dict["blocks"]
+
+    for block in blocks:
+        if "lines" in block:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    texts.append(span["text"])
+                    bboxes.append(span["bbox"])
+
+    return PageSpans(page_num, texts, bboxes, height=page.rect.height)
+
+
+def _extract_page_tables(page, page_num):
+    tables_data = []
+
+    # Find tables on the page
+    tables = page.find_tables()
+
+    # Iterate through found tables and extract their data
+    for table in tables:
+        # Extract table data
+        table_data = table.extract()  # Use the extract method to get table data
+        tables_data.append(
+            {
+                "page": page_num,
+                "bbox": table.bbox,  # Directly access the bbox attribute of the table
+                "data": table_data,
+            }
+        )
+
+    return tables_data
 
 
 class PDFExtractor:
@@ -30,64 +90,135 @@ class PDFExtractor:
 
     def __init__(self, pdf_url):
         self.pdf_url = pdf_url
+        self.content_hash = None
         self.pdf_data = self.download_pdf()
+        self._document = None
+        self._rendered_pages = OrderedDict()
 
     def download_pdf(self):
-        """Downloads PDF from the URL and returns a bytes object."""
-        response = requests.get(self.pdf_url)
-        response.raise_for_status()  # Raises an HTTPError if the response was an error
-        return response.content
-
-    def extract_text_blocks_with_bboxes(self):
-        doc = fitz.open(stream=self.pdf_data, filetype="pdf")
-        all_pages_data = []
-
-        for page_num, page in enumerate(doc):
-            page_data = []
-            page_index = 0
-
-            text_dict = page.get_text("dict")
-            blocks = text_dict["blocks"]
-
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            span_data = {
-                                "index": page_index,
-                                "text": span["text"],
-                                "bbox": span["bbox"],
-                            }
-                            page_data.append(span_data)
-                            page_index += 1
-
-            all_pages_data.append({"page": page_num, "data": page_data})
-
-        doc.close()
-        return all_pages_data
-
-    def extract_tables(self):
-        doc = fitz.open(stream=self.pdf_data, filetype="pdf")
-        all_tables_data = []
-
-        for page_num, page in enumerate(doc):
-            # Find tables on the page
-            tables = page.find_tables()
-
-            # Iterate through found tables and extract their data
-            for table in tables:
-                # Extract table data
-                table_data = table.extract()  # Use the extract method to get table data
-                all_tables_data.append(
-                    {
-                        "page": page_num,
-                        "bbox": table.bbox,  # Directly access the bbox attribute of the table
-                        "data": table_data,
-                    }
-                )
-
-        doc.close()
-        return all_tables_data
+        """
+        Returns a memory-mapped view of the PDF, downloading it only if it is not cached
+        locally.
+        """
+        document_store = get_document_store()
+        self.content_hash = document_store.fetch(self.pdf_url)
+        return document_store.map(self.content_hash)
+
+    @property
+    def document(self):
+        """The fitz document for this PDF, opened once and reused."""
+        if self._document is None:
+            self._document = fitz.open(stream=self.pdf_data, filetype="pdf")
+        return self._document
+
+    def render_page(self, page_num, dpi=200, colorspace="rgb", clip=None, cache=True):
+        """
+        Render a single page to a PIL image using the loaded fitz document.
+
+        Parameters:
+        - page_num: Zero-based page number.
+        - dpi: Resolution of the rendered image.
+        - colorspace: "rgb" or "gray".
+        - clip: Optional (x0, y0, x1, y1) rectangle in PDF points limiting the rendered area.
+        - cache: Keep the image in the document's small LRU of rendered pages.
+
+        Only the RENDER_CACHE_PAGES most recently used renders are kept, enough for the
+        first page shared by categorization and header discovery; pages rendered once
+        (such as every page sent to the vision model) should pass cache=False.
+        """
+        clip = tuple(clip) if clip is not None else None
+        cache_key = (page_num, dpi, colorspace, clip)
+        if cache_key in self._rendered_pages:
+            self._rendered_pages.move_to_end(cache_key)
+            return self._rendered_pages[cache_key]
+
+        if colorspace == "rgb":
+            fitz_colorspace, image_mode = fitz.csRGB, "RGB"
+        elif colorspace == "gray":
+            fitz_colorspace, image_mode = fitz.csGRAY, "L"
+        else:
+            raise ValueError(f"Unsupported colorspace: {colorspace}")
+
+        page = self.document[page_num]
+        pixmap = page.get_pixmap(
+            dpi=dpi, colorspace=fitz_colorspace, clip=clip, alpha=False
+        )
+        image = Image.frombytes(
+            image_mode, (pixmap.width, pixmap.height), pixmap.samples
+        )
+
+        if cache:
+            self._rendered_pages[cache_key] = image
+            while len(self._rendered_pages) > settings.RENDER_CACHE_PAGES:
+                self._rendered_pages.popitem(last=False)
+        return image
+
+    def render_pages(self, start=0, stop=None, dpi=200, colorspace="rgb", clip=None):
+        """Render pages [start, stop) to PIL images; stop defaults to the last page."""
+        page_count = self.document.page_count
+        stop = page_count if stop is None else min(stop, page_count)
+        return [
+            self.render_page(page_num, dpi=dpi, colorspace=colorspace, clip=clip)
+            for page_num in range(start, stop)
+        ]
+
+    def _map_pages(self, page_func, workers=None, chunk_pages=None):
+        """
+        Apply page_func(page, page_num) to every page and return the results in page order.
+
+        With more than one worker, page ranges of chunk_pages pages are sharded across a
+        billiard process pool, which unlike multiprocessing can be started from Celery's
+        daemonic prefork children. Each worker opens a pinned copy of the cached PDF once,
+        so eviction during the run cannot remove it, and at most two chunks per worker are
+        in flight at a time to bound memory.
+        """
+        workers = workers or settings.PDF_EXTRACTION_WORKERS
+        chunk_pages = chunk_pages or settings.PDF_EXTRACTION_CHUNK_PAGES
+        page_count = self.document.page_count
+
+        if workers <= 1 or page_count <= chunk_pages:
+            return [
+                page_func(self.document[page_num], page_num)
+                for page_num in range(page_count)
+            ]
+
+        page_ranges = [
+            (start, min(start + chunk_pages, page_count))
+            for start in range(0, page_count, chunk_pages)
+        ]
+
+        results = []
+        pending = deque()
+        with get_document_store().pinned_path(self.content_hash) as pdf_path:
+            with billiard.Pool(
+                processes=min(workers, len(page_ranges)),
+                initializer=_open_worker_document,
+                initargs=(pdf_path,),
+            ) as pool:
+                for start, stop in page_ranges:
+                    pending.append(
+                        pool.apply_async(_map_page_range, (page_func, start, stop))
+                    )
+                    if len(pending) >= workers * 2:
+                        results.extend(pending.popleft().get())
+                while pending:
+                    results.extend(pending.popleft().get())
+
+        return results
+
+    def extract_page_spans(self, page_num):
+        return _extract_page_text_blocks(self.document[page_num], page_num)
+
+    def extract_text_blocks_with_bboxes(self, workers=None, chunk_pages=None):
+        return self._map_pages(
+            _extract_page_text_blocks, workers=workers, chunk_pages=chunk_pages
+        )
+
+    def extract_tables(self, workers=None, chunk_pages=None):
+        page_tables = self._map_pages(
+            _extract_page_tables, workers=workers, chunk_pages=chunk_pages
+        )
+        return [table for tables in page_tables for table in tables]
 
     def encode_image_to_base64(self, image):
         """Encode PIL image to base64 without saving to disk."""
@@ -100,9 +231,8 @@ class PDFExtractor:
 
         desired_columns = {"columns": ["Date", "Description", "Credit", "Debit"]}
 
-        # Convert PDF to list of images
-        # images = convert_from_path(self.pdf_path, first_page=0, last_page=1)
-        images = pdf_url_to_images(self.pdf_url)
+        # Only the first page is needed to read the headers
+        images = self.render_pages(0, 1)
 
         if images:
             first_image = images[0]
@@ -111,37 +241,20 @@ class PDFExtractor:
             # image_data_url = self.pdf_url
             vision_columns = get_vision_response(image_data_url, desired_columns)
 
-            instruction = f"""Given two lists of column names for a transactions table, return a list of which columns in the second list correspond to the columns in \
-            the first list. Provide the matched column names from the second list in the same order as they appear in the first list.
-            """
-
-            message = f"""
-            LIST 1: 
-            {desired_columns["columns"]}
-            
-            list 2 which represent actual column names:
-            {vision_columns}
-
-            In your returned list, there has to be:
-            - a column for date of transaction
-            - a column for description of transaction
-            - a column for transaction credit
-            - a column for transaction debit
-            """
-
-            chat_response = get_chat_response(
-                instruction,
-                message,
-                example_structure=desired_columns,
-                message_type="for_vision",
-            )
-
-            target_columns = chat_response["columns"]
+            # Line the statement's column names up with Date/Description/Credit/Debit
+            target_columns = map_header_columns(vision_columns)
             return vision_columns, target_columns
         else:
             return []
 
-    def vision_pdf(self):
+    def vision_pdf(self, pages=None, dpi=200, return_exceptions=False):
+        """
+        Extract the transactions of every page, or only of the zero-based `pages`, with
+        the vision model. Returns one {column: values} dict per page, in page order.
+
+        A page that cannot be extracted raises VisionExtractionError, or with
+        return_exceptions is returned as that error in the page's place.
+        """
         vision_data_sample_columns = {
             # name of column that has the dates
             "Date": [
@@ -173,37 +286,90 @@ class PDFExtractor:
             ],
         }
 
-        # # Convert PDF to list of images
-        # images = convert_from_path(self.pdf_path)
-        images = pdf_url_to_images(self.pdf_url)
+        if pages is None:
+            pages = range(self.document.page_count)
+        pages = list(pages)
+        if not pages:
+            return []
 
-        data = []
-        if images:
-            vision_data = None
-            for image in images:
-                success = False
-                while not success:
-                    try:
-                        encoded_image = self.encode_image_to_base64(image)
-                        image_data_url = f"data:image/jpeg;base64,{encoded_image}"
-
-                        vision_data = get_vision_data(
-                            image_data_url, vision_data_sample_columns
-                        )
-                        success = True  # If get_vision_data succeeds, set success to True to exit the loop
-
-                        refined_data = refine_data(
-                            vision_data, vision_data_sample_columns
-                        )
-                        data.append(refined_data)
-                    except Exception as e:
-                        print(f"Error processing image: {e}. Retrying...")
-        return data
+        return asyncio.run(
+            self._vision_pages(
+                pages, dpi, vision_data_sample_columns, return_exceptions
+            )
+        )
+
+    async def _vision_pages(self, pages, dpi, sample_columns, return_exceptions=False):
+        """
+        Send every page to the vision model concurrently, at most VISION_CONCURRENCY at a
+        time, and return the refined page data in page order.
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.VISION_CONCURRENCY))
+        return await asyncio.gather(
+            *(
+                self._vision_page(semaphore, page_num, dpi, sample_columns)
+                for page_num in pages
+            ),
+            return_exceptions=return_exceptions,
+        )
+
+    async def _vision_page(self, semaphore, page_num, dpi, sample_columns):
+        """
+        Extract one page, retrying up to VISION_PAGE_MAX_ATTEMPTS times with exponential
+        backoff. The attempts share a deadline of VISION_PAGE_TIMEOUT seconds that starts
+        once the page gets a concurrency slot.
+
+        The page is rendered only once it has a slot and the image is dropped as soon as
+        it is encoded, so at most VISION_CONCURRENCY page images are alive at a time.
+        """
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.VISION_PAGE_TIMEOUT
+            # Rendered on the loop thread, since the fitz document is not thread-safe
+            image = self.render_page(page_num, dpi=dpi, cache=False)
+            encoded_image = await asyncio.to_thread(self.encode_image_to_base64, image)
+            del image
+            image_data_url = f"data:image/jpeg;base64,{encoded_image}"
+
+            last_error = None
+            for attempt in range(settings.VISION_PAGE_MAX_ATTEMPTS):
+                if attempt:
+                    backoff = settings.VISION_RETRY_BACKOFF * 2 ** (attempt - 1)
+                    await asyncio.sleep(
+                        min(backoff * (0.5 + random.random()), deadline - loop.time())
+                    )
+                if loop.time() >= deadline:
+                    break
+
+                try:
+                    return await asyncio.wait_for(
+                        self._vision_attempt(image_data_url, sample_columns),
+                        deadline - loop.time(),
+                    )
+                except Exception as e:
+                    last_error = e
+                    logger.warning(
+                        f"Vision extraction of page {page_num} failed on attempt "
+                        f"{attempt + 1}: {e!r}"
+                    )
+
+            raise VisionExtractionError(
+                f"Vision extraction of page {page_num} failed: {last_error!r}"
+            )
+
+    @staticmethod
+    async def _vision_attempt(image_data_url, sample_columns):
+        vision_data = await aget_vision_data(image_data_url, sample_columns)
+
+        # Rename columns and drop balance rows locally, only asking the LLM to refine
+        # the page when its columns cannot be resolved
+        normalized = normalize_vision_page(vision_data)
+        if normalized is not None:
+            return normalized
+        return await arefine_data(vision_data, sample_columns)
 
     def get_pdf_category(self):
-        # Convert PDF to list of images
-        # images = convert_from_path(self.pdf_path, first_page=0, last_page=1)
-        images = pdf_url_to_images(self.pdf_url)
+        # Only the first page is needed to read the headers
+        images = self.render_pages(0, 1)
 
         if images:
             first_image = images[0]
@@ -220,22 +386,100 @@ class PDFExtractor:
 class TableHeaderFinder:
     """Finds table headers using fuzzy matching."""
 
+    MATCH_THRESHOLD = 80
+    # Matches found in the top band are only trusted at this score; a weaker one (say a
+    # "Subscription" line above the table for Description) sends the search to the
+    # whole page
+    BAND_MATCH_THRESHOLD = 90
+    BATCH_SIZE = 32
+
     @staticmethod
-    def find_table_headers(text_blocks, target_headers):
-        header_bboxes = {}
-        for block in text_blocks:
-            for target in target_headers:
-                if (
-                    process.fuzz.partial_ratio(target.lower(), block["text"].lower())
-                    > 80
-                ):
-                    header_bboxes[target] = {
-                        "bbox": block["bbox"],
-                        "index": block["index"],
-                    }
-                    break
+    def score_texts(texts, targets, score_cache):
+        """
+        (texts x targets) partial_ratio matrix for already lower-cased texts and targets.
+
+        Every distinct text is scored once per page; score_cache carries the rows across
+        batches.
+        """
+        for text in texts:
+            if text not in score_cache:
+                score_cache[text] = [
+                    process.fuzz.partial_ratio(target, text) for target in targets
+                ]
+        return np.array([score_cache[text] for text in texts], dtype=np.int16).reshape(
+            len(texts), len(targets)
+        )
+
+    @staticmethod
+    def find_table_headers(spans, target_headers, top_band=None):
+        """
+        Map each target header to the bbox and index of the span that best matches it.
+
+        A span is assigned to the first target it matches above MATCH_THRESHOLD, and a later
+        match overrides an earlier one for the same target. Spans are scored in batches and
+        the search stops once every target has a match and the scan has moved below that
+        header row, so transaction descriptions such as "CREDIT INTEREST" can no longer
+        override a header. Only spans starting within the top `top_band` fraction of the
+        page are searched at first; if that does not find every target with a score of at
+        least BAND_MATCH_THRESHOLD, the whole page is.
+        """
+        if top_band is None:
+            top_band = settings.HEADER_SEARCH_TOP_BAND
+
+        targets = [target.lower() for target in target_headers]
+        texts = [text.lower() for text in spans.text]
+        score_cache = {}
+
+        positions = np.arange(len(spans))
+        if spans.height and top_band < 1:
+            in_band = positions[spans.y0 <= spans.height * top_band]
+            header_bboxes, header_scores = TableHeaderFinder._scan(
+                spans, in_band, texts, targets, target_headers, score_cache
+            )
+            if len(header_bboxes) == len(target_headers) and (
+                min(header_scores.values()) >= TableHeaderFinder.BAND_MATCH_THRESHOLD
+            ):
+                return header_bboxes
+
+        header_bboxes, _ = TableHeaderFinder._scan(
+            spans, positions, texts, targets, target_headers, score_cache
+        )
         return header_bboxes
 
+    @staticmethod
+    def _scan(spans, positions, texts, targets, target_headers, score_cache):
+        """The header bboxes found among positions and the score of each match."""
+        header_bboxes = {}
+        header_scores = {}
+        header_bottom = None
+
+        for start in range(0, len(positions), TableHeaderFinder.BATCH_SIZE):
+            batch = positions[start : start + TableHeaderFinder.BATCH_SIZE]
+            scores = TableHeaderFinder.score_texts(
+                [texts[position] for position in batch], targets, score_cache
+            )
+            matches = scores > TableHeaderFinder.MATCH_THRESHOLD
+            matched_rows = np.flatnonzero(matches.any(axis=1))
+            first_targets = matches[matched_rows].argmax(axis=1)
+
+            for row, target_position in zip(matched_rows, first_targets):
+                position = batch[row]
+                if header_bottom is not None and spans.y0[position] > header_bottom:
+                    return header_bboxes, header_scores
+
+                target = target_headers[target_position]
+                header_bboxes[target] = {
+                    "bbox": spans.bbox(position),
+                    "index": int(spans.index[position]),
+                }
+                header_scores[target] = int(scores[row, target_position])
+                if len(header_bboxes) == len(target_headers):
+                    header_bottom = max(
+                        header["bbox"][3] for header in header_bboxes.values()
+                    )
+
+        return header_bboxes, header_scores
+
 
 [
     {
@@ -1,64 +1,100 @@
+from django.conf import settings
+
+from bankanalysis.configs.logging_config import configure_logger
+from verification.pdf.column_resolver import arrange_columns, score_column
 from verification.pdf.data_extractor import DataExtractor
 from verification.pdf.date_utils import DateValidator
 from verification.pdf.grid_definer import GridDefiner
-from verification.pdf.openai_chat import swap_columns
-from verification.pdf.pdf_extractor import PDFExtractor, TableHeaderFinder
+from verification.pdf.layout_templates import (
+    locate_template_headers,
+    save_layout_template,
+)
+from verification.pdf.pdf_extractor import TableHeaderFinder
+from verification.pdf.session import DocumentAnalysisSession
+from verification.pdf.validation import BalanceCheck, validate_rows
+
+logger = configure_logger(__name__)
 
 
 class PDFDataManager:
-    def __init__(self, pdf_url):
-        self.extractor = PDFExtractor(pdf_url)
-        self.header_columns, self.target_columns = self.extractor.get_headers()
+    def __init__(self, pdf_url=None, session=None):
+        if session is None:
+            session = DocumentAnalysisSession(document_id=None, pdf_url=pdf_url)
+        self.session = session
+        self.extractor = session.extractor
+        # Summary of the balance-continuity check of the last extraction, None when the
+        # statement has no Balance column
+        self.balance_validation = None
 
-    def categorize_pdf(self):
-        max_retries = 5  # Maximum number of retries
-        retries = 0  # Current retry count
+    @property
+    def header_columns(self):
+        return self.session.get_headers()[0]
 
-        while retries < max_retries:
-            try:
-                pdf_type = self.extractor.get_pdf_category()
-                return pdf_type
-            except Exception as e:
-                print(f"Error categorizing PDF: {e}. Retrying...")
-                retries += 1  # Increment retry count
+    @property
+    def target_columns(self):
+        return self.session.get_headers()[1]
 
-        # Optional: Return a default value or raise an exception if all retries fail
-        raise Exception("Failed to categorize PDF after maximum retries.")
+    def categorize_pdf(self):
+        return self.session.get_category()
 
     def process_pdf(self):
         stride_step = len(self.header_columns) - 1
 
-        all_pages_data = self.extractor.extract_text_blocks_with_bboxes()
+        # Headers from a learned layout template are located by position, without fuzzy search
+        template = self.session.get_layout_template()
+        if template is not None:
+            stride_step = template.stride
+
+        all_pages_spans = self.extractor.extract_text_blocks_with_bboxes()
         processed_data = []
+        learned_layout = None
 
-        for page_data in all_pages_data:
-            text_blocks = page_data["data"]
-            header_bboxes = TableHeaderFinder.find_table_headers(
-                text_blocks, self.target_columns
-            )
+        for spans in all_pages_spans:
+            header_bboxes = None
+            if template is not None:
+                header_bboxes = locate_template_headers(spans, template.header_bboxes)
+            if header_bboxes is None:
+                header_bboxes = TableHeaderFinder.find_table_headers(
+                    spans, self.target_columns
+                )
             print(header_bboxes)
             start_index_for_searching = (
                 max(header["index"] for header in header_bboxes.values()) + 1
             )
             stride, first_date_index, last_date_index = (
                 GridDefiner.find_stride_and_first_last_date_indices(
-                    text_blocks, start_index_for_searching, stride_step=stride_step
+                    spans, start_index_for_searching, stride_step=stride_step
                 )
             )
 
             if stride:
                 grid = GridDefiner.define_grid(
-                    text_blocks,
+                    spans,
                     first_date_index,
                     stride,
                     last_date_index,
                     header_bboxes,
                     self.target_columns,
                 )
-                extracted_data = DataExtractor.extract_data_using_grid(
-                    text_blocks, grid
-                )
+                extracted_data = DataExtractor.extract_data_using_grid(spans, grid)
                 processed_data.append(extracted_data)
+                if learned_layout is None and grid:
+                    learned_layout = (spans, header_bboxes)
+
+        if (
+            template is None
+            and learned_layout is not None
+            and self.session.layout_fingerprint is not None
+        ):
+            spans, header_bboxes = learned_layout
+            save_layout_template(
+                self.session.layout_fingerprint,
+                self.header_columns,
+                self.target_columns,
+                spans,
+                header_bboxes,
+                stride_step,
+            )
 
         flat_data = [row for page_data in processed_data for row in page_data]
         return flat_data
@@ -116,9 +152,28 @@ class PDFDataManager:
         # print(filtered_tables)
         return filtered_tables
 
+    @property
+    def balance_column(self):
+        """The statement's Balance column name, if it has one besides the target columns."""
+        for name in self.header_columns:
+            if (
+                name not in self.target_columns
+                and score_column(name, "Balance") >= settings.COLUMN_RESOLVER_THRESHOLD
+            ):
+                return name
+        return None
+
     def process_pdf_tables(self):
         filtered_tables = self.filter_tables()
         combined_rows = []
+        balances = []
+        pages = []
+        balance_column = self.balance_column
+        balance_index = (
+            self.header_columns.index(balance_column)
+            if balance_column is not None
+            else None
+        )
 
         # Iterate through each filtered table
         for table in filtered_tables:
@@ -137,26 +192,116 @@ class PDFDataManager:
                     row[index] if index < len(row) else None for index in target_indices
                 ]
                 combined_rows.append(selected_row)
+                if balance_index is not None:
+                    balances.append(
+                        row[balance_index] if balance_index < len(row) else None
+                    )
+                    pages.append(table["page"])
         # print(combined_rows)
-        arranged_columns = swap_columns(self.target_columns)
-        return combined_rows, arranged_columns
+        arranged_columns = arrange_columns(self.target_columns)
 
-    def process_pdf_with_vision(self):
-        data = self.extractor.vision_pdf()
-        print("This is the response from process_pdf_with_vision: ", data)
+        self.balance_validation = None
+        if balance_index is not None and {"Credit", "Debit"} <= set(arranged_columns):
+            credit = arranged_columns.index("Credit")
+            debit = arranged_columns.index("Debit")
+            check = BalanceCheck(
+                [row[credit] for row in combined_rows],
+                [row[debit] for row in combined_rows],
+                balances,
+                pages,
+            )
+            for position in check.swapped_rows:
+                row = combined_rows[position]
+                row[credit], row[debit] = row[debit], row[credit]
+            self.balance_validation = check.summary()
+        return combined_rows, arranged_columns
 
-        # Flatten the data structure
-        flattened_data = []
-        for entry in data:
-            for date, description, credit, debit in zip(
-                entry["Date"], entry["Description"], entry["Credit"], entry["Debit"]
+    @staticmethod
+    def _flatten_vision_data(data, pages):
+        rows = []
+        for page_num, entry in zip(pages, data):
+            balances = entry.get("Balance") or []
+            for position, (date, description, credit, debit) in enumerate(
+                zip(
+                    entry["Date"], entry["Description"], entry["Credit"], entry["Debit"]
+                )
             ):
-                flattened_data.append(
+                rows.append(
                     {
                         "Date": date,
                         "Description": description,
                         "Credit": credit,
                         "Debit": debit,
+                        "Balance": (
+                            balances[position] if position < len(balances) else None
+                        ),
+                        "Page": page_num,
                     }
                 )
-        return flattened_data
+        return rows
+
+    @staticmethod
+    def _inconsistent_rows_on_page(rows, page_num):
+        check = BalanceCheck(
+            [row["Credit"] for row in rows],
+            [row["Debit"] for row in rows],
+            [row["Balance"] for row in rows],
+            [row["Page"] for row in rows],
+        )
+        return int((check.inconsistent & (check.pages == page_num)).sum())
+
+    def process_pdf_with_vision(self):
+        data = self.extractor.vision_pdf()
+        print("This is the response from process_pdf_with_vision: ", data)
+
+        # Flatten the data structure
+        rows = self._flatten_vision_data(data, range(len(data)))
+        check = validate_rows(rows)
+
+        # Pages whose rows do not balance are extracted once more at a higher resolution
+        # (which is also a fresh prompt, not a cached answer) instead of the whole document
+        flagged_pages = check.flagged_pages
+        unresolved_pages = []
+        if flagged_pages:
+            logger.info(
+                f"Re-extracting pages {flagged_pages} with inconsistent balances"
+            )
+            data = self.extractor.vision_pdf(
+                pages=flagged_pages,
+                dpi=settings.VALIDATION_REEXTRACT_DPI,
+                return_exceptions=True,
+            )
+            for page_num, page_data in zip(flagged_pages, data):
+                if isinstance(page_data, BaseException):
+                    logger.warning(
+                        f"Re-extraction of page {page_num} failed, keeping its rows: "
+                        f"{page_data!r}"
+                    )
+                    unresolved_pages.append(page_num)
+                    continue
+
+                # The new rows only replace the page's rows when they balance better
+                candidate = [row for row in rows if row["Page"] != page_num]
+                candidate.extend(self._flatten_vision_data([page_data], [page_num]))
+                candidate.sort(key=lambda row: row["Page"])
+                if self._inconsistent_rows_on_page(
+                    candidate, page_num
+                ) < self._inconsistent_rows_on_page(rows, page_num):
+                    rows = candidate
+                else:
+                    unresolved_pages.append(page_num)
+            check = validate_rows(rows)
+
+        self.balance_validation = check.summary()
+        # Flagged pages that kept their first extraction, because re-extracting them
+        # failed or did not balance better
+        self.balance_validation["unresolved_pages"] = unresolved_pages
+        return [
+            {
+                "Date": row["Date"],
+                "Description": row["Description"],
+                "Credit": row["Credit"],
+                "Debit": row["Debit"],
+            }
+            for row in rows
+        ]
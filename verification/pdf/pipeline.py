@@ -0,0 +1,257 @@
+import random
+import time
+
+import numpy as np
+from django.conf import settings
+
+from bankanalysis.configs.logging_config import configure_logger
+from verification.pdf.df_analyzer import TransactionSummary
+from verification.pdf.pdf_manager import PDFDataManager
+from verification.pdf.result_store import (
+    clear_checkpoints,
+    get_checkpoints,
+    lookup_result,
+    save_checkpoint,
+    store_result,
+)
+
+logger = configure_logger(__name__)
+
+DEFAULT_COLUMNS = ["Date", "Description", "Credit", "Debit"]
+
+
+class PipelineStageError(Exception):
+    def __init__(self, stage, error):
+        super().__init__(f"Stage {stage!r} failed: {error!r}")
+        self.stage = stage
+        self.error = error
+
+
+def convert_numpy(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, dict):
+        return {k: convert_numpy(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_numpy(item) for item in obj]
+    else:
+        return obj
+
+
+class Stage:
+    """
+    One named step of the pipeline with its own retry policy.
+
+    `max_attempts` and `backoff` default to PIPELINE_STAGE_MAX_ATTEMPTS and
+    PIPELINE_RETRY_BACKOFF. Outputs of `persist` stages are also checkpointed in the
+    database, so a later run for the same PDF resumes after them.
+    """
+
+    def __init__(self, name, run, max_attempts=None, backoff=None, persist=False):
+        self.name = name
+        self.run = run
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.persist = persist
+
+    def get_max_attempts(self):
+        if self.max_attempts is not None:
+            return self.max_attempts
+        return settings.PIPELINE_STAGE_MAX_ATTEMPTS
+
+    def get_backoff(self):
+        if self.backoff is not None:
+            return self.backoff
+        return settings.PIPELINE_RETRY_BACKOFF
+
+
+class AnalysisPipeline:
+    """
+    The bank statement analysis as named stages: download, categorize, extract,
+    summarize, gambling and store.
+
+    Each stage's output is checkpointed for the run, so retrying a failed stage (or
+    calling run() again) resumes from the last stage that succeeded; a timeout in the
+    gambling check no longer repeats the download, extraction and vision calls. With
+    PIPELINE_DB_CHECKPOINTS the outputs from categorize onwards are also stored per PDF
+    content (for at most PIPELINE_CHECKPOINT_TTL seconds) until the result is stored or
+    the run fails, so a new task for the same PDF, e.g. after a worker died, resumes too.
+    """
+
+    def __init__(self, session, db_checkpoints=None, on_stage=None):
+        self.session = session
+        # Called with the name of each stage before it runs, e.g. to report job progress
+        self.on_stage = on_stage
+        self.pdf_data_manager = PDFDataManager(session=session)
+        self.db_checkpoints = (
+            settings.PIPELINE_DB_CHECKPOINTS
+            if db_checkpoints is None
+            else db_checkpoints
+        )
+        self.checkpoints = {}
+        self._stored_checkpoints = None
+        self._transaction_summary = None
+        self.stages = [
+            Stage("download", self.download),
+            # The session already retries categorization internally
+            Stage("categorize", self.categorize, max_attempts=1, persist=True),
+            Stage("extract", self.extract, persist=True),
+            Stage("summarize", self.summarize, persist=True),
+            Stage("gambling", self.check_gambling, persist=True),
+            Stage("store", self.store),
+        ]
+
+    @property
+    def pdf_type(self):
+        return self.checkpoints["categorize"]["pdf_type"]
+
+    @property
+    def transaction_summary(self):
+        # Rebuilt from the extract checkpoint, which is all a resumed run has
+        if self._transaction_summary is None:
+            extracted = self.checkpoints["extract"]
+            self._transaction_summary = TransactionSummary(
+                extracted["rows"], header_columns=extracted["columns"]
+            )
+        return self._transaction_summary
+
+    def download(self):
+        return {"content_hash": self.session.extractor.content_hash}
+
+    def categorize(self):
+        return {"pdf_type": self.session.get_category()}
+
+    def extract(self):
+        if self.pdf_type == 1:
+            rows, columns = self.pdf_data_manager.process_pdf_tables()
+        elif self.pdf_type == 2:
+            rows, columns = self.pdf_data_manager.process_pdf(), DEFAULT_COLUMNS
+        else:
+            rows, columns = (
+                self.pdf_data_manager.process_pdf_with_vision(),
+                DEFAULT_COLUMNS,
+            )
+        return {
+            "rows": rows,
+            "columns": columns,
+            "balance_validation": self.pdf_data_manager.balance_validation,
+        }
+
+    def summarize(self):
+        transaction_summary = self.transaction_summary
+        monthly_summary = transaction_summary.generate_monthly_summary()
+        return {
+            # Convert DataFrame to list of dicts
+            "monthly_summary": monthly_summary.to_dict("records"),
+            "affordability_metrics": transaction_summary.generate_affordability_metrics(),
+            "recurring_payments": transaction_summary.detect_recurring_payments(),
+        }
+
+    def check_gambling(self):
+        return {
+            "gambling_activities": self.transaction_summary.check_gambling_activities()
+        }
+
+    def store(self):
+        summary = self.checkpoints["summarize"]
+        result = {
+            "monthly_summary": summary["monthly_summary"],
+            "gambling_activities": self.checkpoints["gambling"]["gambling_activities"],
+            "affordability_metrics": summary["affordability_metrics"],
+            "recurring_payments": summary["recurring_payments"],
+            "balance_validation": self.checkpoints["extract"]["balance_validation"],
+        }
+        content_hash = self.checkpoints["download"]["content_hash"]
+        store_result(self.session.document_id, content_hash, self.pdf_type, result)
+        if self.db_checkpoints:
+            clear_checkpoints(content_hash)
+        return {"result": result}
+
+    def get_stored_checkpoints(self):
+        if self._stored_checkpoints is None:
+            content_hash = self.checkpoints["download"]["content_hash"]
+            self._stored_checkpoints = (
+                get_checkpoints(content_hash) if self.db_checkpoints else {}
+            )
+        return self._stored_checkpoints
+
+    def restore(self, stage):
+        """Takes the stage's output from a stored checkpoint, if there is one."""
+        if not stage.persist:
+            return False
+        output = self.get_stored_checkpoints().get(stage.name)
+        if output is None:
+            return False
+
+        logger.info(f"Resuming after stored {stage.name} checkpoint")
+        self.checkpoints[stage.name] = output
+        if stage.name == "categorize":
+            self.session.pdf_type = output["pdf_type"]
+        return True
+
+    def run_stage(self, stage):
+        max_attempts = max(1, stage.get_max_attempts())
+        for attempt in range(max_attempts):
+            if attempt:
+                backoff = stage.get_backoff() * 2 ** (attempt - 1)
+                time.sleep(backoff * (0.5 + random.random()))
+            try:
+                output = convert_numpy(stage.run())
+            except Exception as e:
+                if attempt + 1 == max_attempts:
+                    logger.error(
+                        f"Stage {stage.name} failed after {max_attempts} attempts: {e!r}"
+                    )
+                    raise PipelineStageError(stage.name, e) from e
+                logger.warning(
+                    f"Stage {stage.name} failed on attempt {attempt + 1}: {e!r}. "
+                    "Retrying..."
+                )
+                continue
+
+            self.checkpoints[stage.name] = output
+            if stage.persist and self.db_checkpoints:
+                content_hash = self.checkpoints["download"]["content_hash"]
+                save_checkpoint(content_hash, stage.name, output)
+            return output
+
+    def clear_stored_checkpoints(self):
+        if self.db_checkpoints and "download" in self.checkpoints:
+            clear_checkpoints(self.checkpoints["download"]["content_hash"])
+        self._stored_checkpoints = {}
+
+    def run(self):
+        """
+        Runs every stage without a checkpoint and returns the analysis result, or None
+        for a PDF of unknown type. Once the PDF is downloaded, a result stored for the
+        same content (e.g. the same PDF uploaded under another document id) is returned
+        without running the other stages. Raises PipelineStageError when a stage runs
+        out of attempts. A run that fails this way (or finds an unknown type) drops its stored
+        checkpoints, so possibly bad stage outputs are not reused by the next task; the
+        in-memory ones stay for a caller that retries with this pipeline.
+        """
+        try:
+            for stage in self.stages:
+                if stage.name not in self.checkpoints and not self.restore(stage):
+                    if self.on_stage is not None:
+                        self.on_stage(stage.name)
+                    self.run_stage(stage)
+
+                if stage.name == "download":
+                    result = lookup_result(
+                        document_id=self.session.document_id,
+                        content_hash=self.checkpoints["download"]["content_hash"],
+                    )
+                    if result is not None:
+                        return result
+
+                if stage.name == "categorize" and self.pdf_type not in (1, 2, 3):
+                    # Handle unexpected PDF type
+                    logger.error(f"Unknown PDF type {self.pdf_type!r}")
+                    self.clear_stored_checkpoints()
+                    return None
+        except PipelineStageError:
+            self.clear_stored_checkpoints()
+            raise
+
+        return self.checkpoints["store"]["result"]
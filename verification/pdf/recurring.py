@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# (cadence, typical interval in days, tolerance in days)
+CADENCES = [
+    ("weekly", 7, 1.5),
+    ("biweekly", 14, 2.5),
+    ("monthly", 30.4, 4),
+    ("quarterly", 91.3, 8),
+]
+
+SALARY_PATTERN = r"\b(?:salary|sal|payroll|wages?|stipend)\b"
+
+MIN_OCCURRENCES = 3
+# Series below this confidence (e.g. irregular transfers that happen to average a
+# cadence) are not reported
+MIN_CONFIDENCE = 0.5
+# Amounts within this fraction of the previous one in sorted order share an amount band
+AMOUNT_TOLERANCE = 0.1
+
+
+def _classify_cadence(median_interval):
+    for name, days, tolerance in CADENCES:
+        if abs(median_interval - days) <= tolerance:
+            return name
+    return None
+
+
+def _transactions(df):
+    """Credits and debits as one long frame of (direction, canonical, amount, date)."""
+    columns = {"Date": "date", "Canonical": "canonical", "Description": "description"}
+    parts = []
+    for direction, column in (("credit", "Credit"), ("debit", "Debit")):
+        rows = df.loc[(df[column] > 0) & df["Date"].notna()]
+        part = rows[list(columns)].rename(columns=columns)
+        part["amount"] = rows[column].to_numpy()
+        part["direction"] = direction
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def detect_recurring_payments(
+    df, min_occurrences=MIN_OCCURRENCES, amount_tolerance=AMOUNT_TOLERANCE
+):
+    """
+    Finds periodic series (salary, standing orders, loan repayments, subscriptions) in
+    a transaction frame with Date, Description, Canonical, Credit and Debit columns.
+
+    Transactions are grouped by direction, canonical description and amount band. A
+    band starts whenever an amount exceeds the previous one (in sorted order) by more
+    than `amount_tolerance`, so a salary drifting between 349,000 and 352,000 stays in
+    one series. Interval statistics are computed per series with vectorized group
+    operations after two sorts, so the whole detection is O(n log n).
+
+    Returns the series with at least `min_occurrences` payments at a recognised cadence
+    and at least MIN_CONFIDENCE confidence, most confident first.
+    """
+    transactions = _transactions(df)
+    if transactions.empty:
+        return []
+
+    # Amount bands: sort by (direction, canonical, amount) and cut on gaps
+    transactions = transactions.sort_values(
+        ["direction", "canonical", "amount"], kind="stable", ignore_index=True
+    )
+    same_key = (
+        transactions["direction"].eq(transactions["direction"].shift())
+        & transactions["canonical"].eq(transactions["canonical"].shift())
+    ).to_numpy(dtype=bool, na_value=False)
+    amounts = transactions["amount"].to_numpy()
+    gap = np.r_[False, amounts[1:] > amounts[:-1] * (1 + amount_tolerance)]
+    transactions["series"] = np.cumsum(~same_key | gap)
+
+    # Intervals between consecutive payments of each series
+    transactions = transactions.sort_values(
+        ["series", "date"], kind="stable", ignore_index=True
+    )
+    transactions["interval"] = (
+        transactions.groupby("series")["date"].diff().dt.total_seconds() / 86400
+    )
+
+    grouped = transactions.groupby("series")
+    series = grouped.agg(
+        direction=("direction", "first"),
+        canonical=("canonical", "first"),
+        description=("description", "first"),
+        occurrences=("amount", "size"),
+        amount=("amount", "median"),
+        amount_std=("amount", "std"),
+        first_date=("date", "min"),
+        last_date=("date", "max"),
+        median_interval=("interval", "median"),
+        interval_std=("interval", "std"),
+    )
+    series = series[series["occurrences"] >= min_occurrences]
+    if series.empty:
+        return []
+
+    series["cadence"] = series["median_interval"].map(_classify_cadence)
+    series = series[series["cadence"].notna()].copy()
+    if series.empty:
+        return []
+
+    # Confidence from interval regularity, amount stability and the number of payments
+    regularity = 1 - (
+        series["interval_std"].fillna(0) / series["median_interval"]
+    ).clip(0, 1)
+    stability = 1 - (series["amount_std"].fillna(0) / series["amount"]).clip(0, 1)
+    history = ((series["occurrences"] - 1) / 6).clip(0, 1)
+    series["confidence"] = 0.5 * regularity + 0.2 * stability + 0.3 * history
+    series = series[series["confidence"] >= MIN_CONFIDENCE]
+    if series.empty:
+        return []
+
+    monthly_credits = series[
+        (series["direction"] == "credit") & (series["cadence"] == "monthly")
+    ]
+    named_salary = series["canonical"].str.contains(SALARY_PATTERN, regex=True)
+    largest_monthly_credit = (
+        series.index == monthly_credits["amount"].idxmax()
+        if not monthly_credits.empty
+        else np.zeros(len(series), dtype=bool)
+    )
+    series["likely_salary"] = (
+        (series["direction"] == "credit")
+        & (series["cadence"] == "monthly")
+        & (named_salary | largest_monthly_credit)
+    )
+
+    series = series.sort_values(["confidence", "amount"], ascending=False)
+    return [
+        {
+            "description": row.description,
+            "canonical_description": row.canonical,
+            "direction": row.direction,
+            "cadence": row.cadence,
+            "amount": round(float(row.amount), 2),
+            "occurrences": int(row.occurrences),
+            "first_date": row.first_date.strftime("%Y-%m-%d"),
+            "last_date": row.last_date.strftime("%Y-%m-%d"),
+            "confidence": round(float(row.confidence), 2),
+            "likely_salary": bool(row.likely_salary),
+        }
+        for row in series.itertuples()
+    ]
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from bankanalysis.configs.logging_config import configure_logger
+from verification.models import AnalysisCheckpoint, BankStatementAnalysis
+
+logger = configure_logger(__name__)
+
+
+def get_pipeline_version():
+    return settings.ANALYSIS_PIPELINE_VERSION
+
+
+def lookup_result(document_id=None, content_hash=None):
+    """
+    Returns the stored analysis result for the current pipeline version, or None.
+
+    The document id is tried first since it needs no download. A content hash match
+    for a different document id (the same PDF uploaded twice) is copied over to the
+    requested document id so the next call hits on the id alone.
+    """
+    analyses = BankStatementAnalysis.objects.filter(
+        pipeline_version=get_pipeline_version()
+    )
+
+    if document_id is not None:
+        analysis = analyses.filter(document_id=document_id).first()
+        if analysis is not None:
+            logger.info(f"Analysis cache hit for document {document_id}")
+            return analysis.result
+
+    if content_hash is not None:
+        analysis = (
+            analyses.filter(content_hash=content_hash).order_by("-updated_at").first()
+        )
+        if analysis is not None:
+            logger.info(f"Analysis cache hit for content {content_hash}")
+            if document_id is not None:
+                store_result(
+                    document_id, content_hash, analysis.pdf_type, analysis.result
+                )
+            return analysis.result
+
+    return None
+
+
+def store_result(document_id, content_hash, pdf_type, result):
+    if document_id is None or content_hash is None or result is None:
+        return None
+
+    analysis, _ = BankStatementAnalysis.objects.update_or_create(
+        document_id=document_id,
+        pipeline_version=get_pipeline_version(),
+        defaults={
+            "content_hash": content_hash,
+            "pdf_type": pdf_type,
+            "result": result,
+        },
+    )
+    return analysis
+
+
+def invalidate_results(document_id=None, content_hash=None, stale_only=True):
+    """
+    Deletes stored analyses and returns how many were removed.
+
+    With stale_only (the default) only results from other pipeline versions are removed;
+    otherwise every matching result is removed regardless of version.
+    """
+    analyses = BankStatementAnalysis.objects.all()
+    checkpoints = AnalysisCheckpoint.objects.all()
+    if stale_only:
+        analyses = analyses.exclude(pipeline_version=get_pipeline_version())
+        checkpoints = checkpoints.filter(
+            Q(updated_at__lt=_checkpoint_cutoff())
+            | ~Q(pipeline_version=get_pipeline_version())
+        )
+    if document_id is not None:
+        analyses = analyses.filter(document_id=document_id)
+        # Checkpoints are only keyed by content, so go through the document's analyses
+        checkpoints = checkpoints.filter(
+            content_hash__in=BankStatementAnalysis.objects.filter(
+                document_id=document_id
+            ).values("content_hash")
+        )
+    if content_hash is not None:
+        analyses = analyses.filter(content_hash=content_hash)
+        checkpoints = checkpoints.filter(content_hash=content_hash)
+
+    # Checkpoints first, since the document filter above reads the analyses
+    deleted_checkpoints, _ = checkpoints.delete()
+    deleted, _ = analyses.delete()
+    logger.info(
+        f"Invalidated {deleted} stored analyses and {deleted_checkpoints} checkpoints"
+    )
+    return deleted
+
+
+def _checkpoint_cutoff():
+    return timezone.now() - timedelta(seconds=settings.PIPELINE_CHECKPOINT_TTL)
+
+
+def get_checkpoints(content_hash):
+    """
+    {stage: output} of the unexpired checkpoints stored for the PDF by the current
+    pipeline. Expired checkpoints and those of other pipeline versions are deleted.
+    """
+    checkpoints = AnalysisCheckpoint.objects.filter(content_hash=content_hash)
+    checkpoints.filter(
+        Q(updated_at__lt=_checkpoint_cutoff())
+        | ~Q(pipeline_version=get_pipeline_version())
+    ).delete()
+    return {
+        checkpoint.stage: checkpoint.output
+        for checkpoint in checkpoints.filter(pipeline_version=get_pipeline_version())
+    }
+
+
+def save_checkpoint(content_hash, stage, output):
+    AnalysisCheckpoint.objects.update_or_create(
+        content_hash=content_hash,
+        pipeline_version=get_pipeline_version(),
+        stage=stage,
+        defaults={"output": output},
+    )
+
+
+def clear_checkpoints(content_hash):
+    AnalysisCheckpoint.objects.filter(content_hash=content_hash).delete()
@@ -0,0 +1,114 @@
+from verification.pdf.layout_templates import (
+    bank_fingerprint,
+    find_layout_template,
+    get_layout_template,
+)
+from verification.pdf.pdf_extractor import PDFExtractor
+
+
+class DocumentAnalysisSession:
+    """
+    Per-document state shared by every stage of a bank statement analysis.
+
+    The statement category, the vision header columns and the mapped target columns each
+    cost one or more GPT-4 calls, so they are computed at most once per run and carried
+    across the view/Celery boundary with to_dict()/from_dict(). Type-2 statements from a
+    bank we have already parsed take their headers from the learned layout template.
+    """
+
+    def __init__(
+        self,
+        document_id,
+        pdf_url,
+        pdf_type=None,
+        header_columns=None,
+        target_columns=None,
+        content_hash=None,
+        layout_fingerprint=None,
+        layout_template_applied=False,
+    ):
+        self.document_id = document_id
+        self.pdf_url = pdf_url
+        self.pdf_type = pdf_type
+        self.header_columns = header_columns
+        self.target_columns = target_columns
+        self.content_hash = content_hash
+        self.layout_fingerprint = layout_fingerprint
+        self.layout_template_applied = layout_template_applied
+        self._extractor = None
+
+    @property
+    def extractor(self):
+        if self._extractor is None:
+            self._extractor = PDFExtractor(self.pdf_url)
+            self.content_hash = self._extractor.content_hash
+        return self._extractor
+
+    def get_category(self, max_retries=5):
+        if self.pdf_type is not None:
+            return self.pdf_type
+
+        retries = 0  # Current retry count
+        while retries < max_retries:
+            try:
+                self.pdf_type = self.extractor.get_pdf_category()
+                return self.pdf_type
+            except Exception as e:
+                print(f"Error categorizing PDF: {e}. Retrying...")
+                retries += 1  # Increment retry count
+
+        raise Exception("Failed to categorize PDF after maximum retries.")
+
+    def get_headers(self):
+        if self.header_columns is None or self.target_columns is None:
+            template = self.find_layout_template()
+            if template is not None:
+                self.header_columns = template.header_columns
+                self.target_columns = template.target_columns
+            else:
+                self.header_columns, self.target_columns = self.extractor.get_headers()
+        return self.header_columns, self.target_columns
+
+    def find_layout_template(self):
+        """Look up and validate the learned layout template for a type-2 statement."""
+        if self.pdf_type != 2:
+            return None
+
+        if self.layout_fingerprint is None:
+            self.layout_fingerprint = bank_fingerprint(self.extractor.document)
+        template = find_layout_template(
+            self.layout_fingerprint, self.extractor.extract_page_spans(0)
+        )
+        self.layout_template_applied = template is not None
+        return template
+
+    def get_layout_template(self):
+        """The template the headers came from, if any."""
+        if not self.layout_template_applied:
+            return None
+        return get_layout_template(self.layout_fingerprint)
+
+    def to_dict(self):
+        return {
+            "document_id": self.document_id,
+            "pdf_url": self.pdf_url,
+            "pdf_type": self.pdf_type,
+            "header_columns": self.header_columns,
+            "target_columns": self.target_columns,
+            "content_hash": self.content_hash,
+            "layout_fingerprint": self.layout_fingerprint,
+            "layout_template_applied": self.layout_template_applied,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            document_id=data.get("document_id"),
+            pdf_url=data["pdf_url"],
+            pdf_type=data.get("pdf_type"),
+            header_columns=data.get("header_columns"),
+            target_columns=data.get("target_columns"),
+            content_hash=data.get("content_hash"),
+            layout_fingerprint=data.get("layout_fingerprint"),
+            layout_template_applied=data.get("layout_template_applied", False),
+        )
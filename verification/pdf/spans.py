@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class Span:
+    """A single text span, as returned when indexing a PageSpans container."""
+
+    __slots__ = ("index", "text", "bbox")
+
+    def __init__(self, index, text, bbox):
+        self.index = index
+        self.text = text
+        self.bbox = bbox
+
+    def __repr__(self):
+        return f"Span(index={self.index}, text={self.text!r}, bbox={self.bbox})"
+
+
+class PageSpans:
+    """
+    Columnar storage for the text spans of one page.
+
+    Instead of one {"index", "text", "bbox"} dict per span, coordinates are kept in
+    float32 arrays (x0, y0, x1, y1), span indices in an int32 array and the texts in a
+    single list. Positions in the container are the span indices, so spans.text[i] and
+    spans.bbox(i) describe the span with index i.
+    """
+
+    __slots__ = ("page", "height", "index", "text", "x0", "y0", "x1", "y1")
+
+    def __init__(self, page, text, bboxes, height=None):
+        coords = np.asarray(bboxes, dtype=np.float32).reshape(len(text), 4)
+
+        self.page = page
+        self.height = height
+        self.index = np.arange(len(text), dtype=np.int32)
+        self.text = list(text)
+        self.x0 = np.ascontiguousarray(coords[:, 0])
+        self.y0 = np.ascontiguousarray(coords[:, 1])
+        self.x1 = np.ascontiguousarray(coords[:, 2])
+        self.y1 = np.ascontiguousarray(coords[:, 3])
+
+    def __len__(self):
+        return len(self.text)
+
+    def __getitem__(self, position):
+        return Span(int(self.index[position]), self.text[position], self.bbox(position))
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def bbox(self, position):
+        """The (x0, y0, x1, y1) bbox of one span as Python floats."""
+        return (
+            float(self.x0[position]),
+            float(self.y0[position]),
+            float(self.x1[position]),
+            float(self.y1[position]),
+        )
@@ -0,0 +1,94 @@
+import numpy as np
+
+from verification.pdf.amount_utils import parse_amounts, parse_flows
+
+# Largest difference (in naira) still treated as equal when checking balances
+BALANCE_TOLERANCE = 0.011
+
+
+class BalanceCheck:
+    """
+    Vectorized balance-continuity check over extracted statement rows.
+
+    Every row with a balance is checked against the previous row's balance:
+    balance[i - 1] + credit[i] - debit[i] == balance[i]. Statements listed newest first
+    are checked the other way round; the order that explains more rows wins. Rows that
+    only balance with credit and debit exchanged are marked as swapped, and rows that do
+    not balance either way are inconsistent. Rows without a balance, and the first row,
+    are not checked.
+    """
+
+    def __init__(self, credits, debits, balances, pages=None):
+        inflow, outflow = parse_flows(credits, debits)
+        credit = inflow.to_numpy()
+        debit = outflow.to_numpy()
+        balance = parse_amounts(balances).to_numpy()
+        self.pages = np.asarray(pages) if pages is not None else None
+
+        previous = np.full_like(balance, np.nan)
+        previous[1:] = balance[:-1]
+        following = np.full_like(balance, np.nan)
+        following[:-1] = balance[1:]
+
+        ascending = self._check(credit, debit, previous, balance)
+        descending = self._check(credit, debit, following, balance)
+        self.descending = descending[0].sum() > ascending[0].sum()
+        self.consistent, self.swapped, self.checked = (
+            descending if self.descending else ascending
+        )
+        self.inconsistent = self.checked & ~self.consistent & ~self.swapped
+
+    @staticmethod
+    def _check(credit, debit, previous, balance):
+        checked = ~np.isnan(previous) & ~np.isnan(balance)
+        with np.errstate(invalid="ignore"):
+            consistent = checked & (
+                np.abs(previous + credit - debit - balance) <= BALANCE_TOLERANCE
+            )
+            swapped = (
+                checked
+                & ~consistent
+                & (np.abs(previous - credit + debit - balance) <= BALANCE_TOLERANCE)
+            )
+        return consistent, swapped, checked
+
+    @property
+    def swapped_rows(self):
+        return np.flatnonzero(self.swapped).tolist()
+
+    @property
+    def inconsistent_rows(self):
+        return np.flatnonzero(self.inconsistent).tolist()
+
+    @property
+    def flagged_pages(self):
+        """Pages with at least one inconsistent row, the candidates for re-extraction."""
+        if self.pages is None:
+            return []
+        return sorted({int(page) for page in self.pages[self.inconsistent]})
+
+    def summary(self):
+        return {
+            "checked_rows": int(self.checked.sum()),
+            "consistent_rows": int(self.consistent.sum()),
+            "swapped_rows": self.swapped_rows,
+            "inconsistent_rows": self.inconsistent_rows,
+            "flagged_pages": self.flagged_pages,
+        }
+
+
+def validate_rows(rows):
+    """
+    Checks rows of {"Credit", "Debit", "Balance", "Page"} dicts and exchanges Credit and
+    Debit in place on the rows that only balance that way. Returns the BalanceCheck.
+    """
+    check = BalanceCheck(
+        [row.get("Credit") for row in rows],
+        [row.get("Debit") for row in rows],
+        [row.get("Balance") for row in rows],
+        [row.get("Page", -1) for row in rows],
+    )
+    for position in check.swapped_rows:
+        row = rows[position]
+        row["Credit"], row["Debit"] = row["Debit"], row["Credit"]
+    return check
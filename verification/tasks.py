@@ -1,14 +1,223 @@
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlparse
+
 from celery import shared_task
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from bankanalysis.configs.logging_config import configure_logger
+from helpers.http_client import get_http_client
+from verification.models import AnalysisJob
+from verification.pdf.analyze import get_analysis_session, get_stored_analysis
+from verification.pdf.pipeline import AnalysisPipeline, PipelineStageError
+
+logger = configure_logger(__name__)
+
+
+class JobAbandoned(Exception):
+    """The job was marked failed as stale while its worker was still running it."""
+
+
+def is_allowed_webhook_url(url):
+    """
+    Whether analysis results may be posted to `url`: an https URL on one of the
+    ANALYSIS_WEBHOOK_ALLOWED_HOSTS. With no hosts configured, webhooks are disabled.
+    """
+    try:
+        URLValidator(schemes=["https"])(url)
+    except ValidationError:
+        return False
+    hostname = (urlparse(url).hostname or "").lower()
+    allowed_hosts = {host.lower() for host in settings.ANALYSIS_WEBHOOK_ALLOWED_HOSTS}
+    return hostname in allowed_hosts
+
+
+def _fail_stale_jobs(document_id):
+    """
+    Marks the document's pending or running jobs without progress for
+    ANALYSIS_JOB_STALE_AFTER seconds as failed, e.g. after their worker died.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYSIS_JOB_STALE_AFTER)
+    stale = AnalysisJob.objects.filter(
+        document_id=document_id,
+        status__in=AnalysisJob.ACTIVE_STATUSES,
+        updated_at__lt=cutoff,
+    )
+    failed = stale.update(
+        status=AnalysisJob.STATUS_FAILED,
+        error="Job made no progress and was abandoned",
+        completed_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+    if failed:
+        logger.warning(f"Abandoned {failed} stale jobs for document {document_id}")
+
+
+def _enqueue_job(job_id):
+    """Queues the job, or marks it failed if the broker cannot be reached."""
+    try:
+        run_analysis_job.delay(job_id)
+    except Exception as e:
+        logger.error(f"Could not queue job {job_id}: {e!r}")
+        AnalysisJob.objects.filter(id=job_id, status=AnalysisJob.STATUS_PENDING).update(
+            status=AnalysisJob.STATUS_FAILED,
+            error="Job could not be queued",
+            completed_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+
+
+def submit_analysis_job(document_id, created_by, webhook_url=""):
+    """
+    Creates a job for the document on behalf of the `created_by` user and queues it on a
+    Celery worker once the transaction commits. A pending or running job the same user
+    submitted for the document that is not stale is returned instead of starting
+    another one; the unique_active_analysis_job constraint settles concurrent
+    submissions.
+    """
+    _fail_stale_jobs(document_id)
+    active_jobs = AnalysisJob.objects.filter(
+        document_id=document_id,
+        created_by=created_by,
+        status__in=AnalysisJob.ACTIVE_STATUSES,
+    ).order_by("-created_at")
+
+    job = active_jobs.first()
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = AnalysisJob.objects.create(
+                    document_id=document_id,
+                    created_by=created_by,
+                    webhook_url=webhook_url,
+                )
+        except IntegrityError:
+            # Another request created the active job between our lookup and insert
+            job = active_jobs.first()
+            if job is None:
+                raise
+        else:
+            job_id = str(job.id)
+            transaction.on_commit(lambda: _enqueue_job(job_id))
+            # Outside a transaction the job was queued (or failed to) right away
+            job.refresh_from_db()
+            return job
 
-from verification.pdf.analyze import process_pdf_with_retry
+    if webhook_url and not job.webhook_url:
+        job.webhook_url = webhook_url
+        job.save(update_fields=["webhook_url", "updated_at"])
+    return job
+
+
+def _running(job_id):
+    return AnalysisJob.objects.filter(id=job_id, status=AnalysisJob.STATUS_RUNNING)
+
+
+def _set_stage(job, stage):
+    if not _running(job.id).update(stage=stage, updated_at=timezone.now()):
+        raise JobAbandoned(job.id)
+    job.stage = stage
+
+
+@contextmanager
+def _heartbeat(job_id):
+    """
+    Refreshes the running job's updated_at every ANALYSIS_JOB_HEARTBEAT seconds from a
+    background thread, so a stage that runs for long (e.g. a large extraction) is not
+    abandoned as stale while its worker is alive.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.ANALYSIS_JOB_HEARTBEAT):
+                _running(job_id).update(updated_at=timezone.now())
+        except Exception as e:
+            logger.error(f"Job {job_id} heartbeat failed: {e!r}")
+        finally:
+            # The thread has its own database connection
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"job-heartbeat-{job_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _finish_job(job, status, result=None, error=""):
+    """
+    Records the outcome of a running job and posts it to the webhook. A job that was
+    abandoned as stale in the meantime stays failed and its webhook is not called.
+    """
+    now = timezone.now()
+    finished = _running(job.id).update(
+        status=status, result=result, error=error, completed_at=now, updated_at=now
+    )
+    if not finished:
+        logger.warning(f"Job {job.id} was abandoned before it finished as {status}")
+        return
+    job.refresh_from_db()
+
+    # Checked again in case the allowed hosts changed since the job was submitted
+    if job.webhook_url and is_allowed_webhook_url(job.webhook_url):
+        try:
+            response = get_http_client().post(
+                job.webhook_url, json=job.to_dict(), allow_redirects=False
+            )
+            logger.info(
+                f"Job {job.id} webhook answered with status {response.status_code}"
+            )
+        except Exception as e:
+            logger.error(f"Job {job.id} webhook failed: {e}")
 
 
 @shared_task
-def process_pdf_task(pdf_type, public_url):
-    if pdf_type == 1 or pdf_type == 2:
-        # Process immediately for straightforward cases
-        return process_pdf_with_retry(pdf_type, public_url)
-    elif pdf_type == 3:
-        # For more intensive processing, just return an acknowledgment or status
-        # Actual processing can be done here if it's quick enough, or triggered as another task if needed
-        return "Processing started for PDF type 2, please check back later for results."
+def run_analysis_job(job_id):
+    """
+    Runs the whole analysis of a job's document (download, categorization and every
+    pipeline stage) on the worker, recording the stage as it goes.
+    """
+    job = AnalysisJob.objects.filter(id=job_id).first()
+    if job is None:
+        return None
+    started = AnalysisJob.objects.filter(
+        id=job.id, status__in=AnalysisJob.ACTIVE_STATUSES
+    ).update(status=AnalysisJob.STATUS_RUNNING, updated_at=timezone.now())
+    if not started:
+        return None
+
+    try:
+        with _heartbeat(job.id):
+            result = get_stored_analysis(job.document_id)
+            if result is None:
+                # The download runs as the pipeline's first stage, with its retries
+                session = get_analysis_session(job.document_id)
+                result = AnalysisPipeline(
+                    session, on_stage=lambda stage: _set_stage(job, stage)
+                ).run()
+    except JobAbandoned:
+        # Its checkpoints are kept, so a new job for the document resumes from them
+        logger.warning(f"Job {job_id} was abandoned as stale, stopping")
+        return None
+    except PipelineStageError as e:
+        _finish_job(job, AnalysisJob.STATUS_FAILED, error=str(e))
+        return None
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        _finish_job(job, AnalysisJob.STATUS_FAILED, error=f"{e!r}")
+        return None
+
+    if result is None:
+        _finish_job(job, AnalysisJob.STATUS_FAILED, error="Invalid PDF type")
+        return None
+
+    _finish_job(job, AnalysisJob.STATUS_COMPLETED, result=result)
+    return str(job.id)
@@ -1,3 +1,400 @@
-from django.test import TestCase
+import math
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import fitz
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from verification import tasks
+from verification.models import AnalysisCheckpoint, AnalysisJob
+from verification.pdf.amount_utils import parse_amounts, parse_flows
+from verification.pdf.data_extractor import DataExtractor
+from verification.pdf.date_utils import DateValidator
+from verification.pdf.df_analyzer import TransactionSummary
+from verification.pdf.gambling import (
+    GAMBLING,
+    NOT_GAMBLING,
+    UNRESOLVED,
+    PatternAutomaton,
+    classify_description,
+)
+from verification.pdf.pdf_extractor import TableHeaderFinder, _extract_page_text_blocks
+from verification.pdf.pipeline import AnalysisPipeline, PipelineStageError
+from verification.pdf.spans import PageSpans
+from verification.pdf.validation import validate_rows
+
+HEADERS = ["Date", "Description", "Credit", "Debit", "Balance"]
+COLUMN_X = [40, 120, 330, 410, 490]
+
+
+def build_statement_spans(header_y, preamble=(), rows=()):
+    """Spans of a one-page statement with a header row at header_y and rows below it."""
+    document = fitz.open()
+    page = document.new_page()
+    for y, text in preamble:
+        page.insert_text((40, y), text, fontsize=9)
+    lines = [(header_y, HEADERS)] + [
+        (header_y + 15 * (number + 1), row) for number, row in enumerate(rows)
+    ]
+    for y, cells in lines:
+        for x, text in zip(COLUMN_X, cells):
+            if text:
+                page.insert_text((x, y), text, fontsize=9)
+    return _extract_page_text_blocks(document[0], 0)
+
+
+class DataExtractorTests(TestCase):
+    def test_overlap_mask_matches_span_by_span_loop(self):
+        spans = PageSpans(
+            0,
+            ["02-Jan-2023", "POS PURCHASE", "SHOPRITE", "1,200.00", "edge", "outside"],
+            [
+                (40, 100, 90, 110),
+                (120, 100, 200, 110),
+                (120, 111, 180, 121),
+                (330, 100, 370, 110),
+                # Touches the date cell's right edge, which overlaps as before
+                (100, 100, 110, 110),
+                (600, 400, 650, 410),
+            ],
+            height=842,
+        )
+        edges = [(40, 100), (100, 320), (330, 400)]
+        grid = [
+            [
+                {"name": name, "bbox": (x0, top, x1 - 1e-10, top + 12)}
+                for name, (x0, x1) in zip(["Date", "Description", "Credit"], edges)
+            ]
+            for top in (99.5, 111.5)
+        ]
+
+        expected = [
+            [
+                " ".join(
+                    text
+                    for position, text in enumerate(spans.text)
+                    if DataExtractor.block_overlaps_bbox(
+                        spans.bbox(position), cell["bbox"]
+                    )
+                ).strip()
+                for cell in row
+            ]
+            for row in grid
+        ]
+        self.assertEqual(DataExtractor.extract_data_using_grid(spans, grid), expected)
+
+
+class DateValidatorTests(TestCase):
+    def test_bare_numbers_are_left_to_dateutil(self):
+        for value in ["12", "2022", "20230102"]:
+            with self.subTest(value):
+                self.assertTrue(DateValidator.is_valid_date(value))
+
+    def test_compact_dates_are_year_month_day(self):
+        self.assertEqual(DateValidator.parse_date("20230102"), datetime(2023, 1, 2))
+        self.assertEqual(DateValidator.match_format("20230102"), "%Y%m%d")
+
+    def test_amounts_are_not_dates(self):
+        for value in ["1,200.00", "(500.00)", "-25", "N1,000.00 CR", "500 DR"]:
+            with self.subTest(value):
+                self.assertFalse(DateValidator.is_valid_date(value))
+
+    def test_statement_formats(self):
+        self.assertEqual(DateValidator.parse_date("02-Jan-2023"), datetime(2023, 1, 2))
+        self.assertEqual(DateValidator.parse_date("01/12/2022"), datetime(2022, 12, 1))
+        self.assertEqual(DateValidator.match_format("2023-01-02"), "%Y-%m-%d")
+
+
+class TableHeaderFinderTests(TestCase):
+    ROWS = [
+        ["01-Jan-2023", "Opening Balance", "", "", "1,000.00"],
+        ["02-Jan-2023", "CREDIT INTEREST", "4.10", "", "1,004.10"],
+        ["03-Jan-2023", "POS Debit Card", "", "50.00", "954.10"],
+        ["04-Jan-2023", "Closing Balance", "", "", "954.10"],
+    ]
+    STATEMENTS = {
+        "header at the top": build_statement_spans(120, rows=ROWS),
+        "header below the band": build_statement_spans(
+            600, preamble=[(100, "Account statement")], rows=ROWS
+        ),
+        "weak match above the header": build_statement_spans(
+            200, preamble=[(100, "Subscription plan: Gold")], rows=ROWS
+        ),
+        "weak match in the band": build_statement_spans(
+            600, preamble=[(100, "Subscription plan: Gold")], rows=ROWS
+        ),
+    }
+
+    def test_top_band_matches_full_scan(self):
+        for name, spans in self.STATEMENTS.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    TableHeaderFinder.find_table_headers(spans, HEADERS, top_band=0.5),
+                    TableHeaderFinder.find_table_headers(spans, HEADERS, top_band=1),
+                )
+
+    def test_body_text_does_not_override_headers(self):
+        spans = self.STATEMENTS["header at the top"]
+        headers = TableHeaderFinder.find_table_headers(spans, HEADERS, top_band=0.5)
+
+        self.assertEqual(set(headers), set(HEADERS))
+        for target, header in headers.items():
+            self.assertEqual(spans.text[header["index"]], target)
+
+
+class GamblingClassificationTests(TestCase):
+    def test_automaton_finds_overlapping_patterns(self):
+        automaton = PatternAutomaton(["he", "she", "his", "hers"])
+
+        self.assertEqual(automaton.find("ushers"), {"he", "she", "hers"})
+        self.assertEqual(automaton.find("this"), {"his"})
+        self.assertEqual(automaton.find("xyz"), set())
+
+    def test_merchants_match_on_word_boundaries(self):
+        cases = {
+            "WEB PAYMENT BET9JA 1234": GAMBLING,
+            "NIP TRF TO SPORTY BET/0012": GAMBLING,
+            "Sporty-Bet topup": GAMBLING,
+            # "msport" only occurs inside other words
+            "SMS PORTAL CHARGES": UNRESOLVED,
+            "lotto stake ref": UNRESOLVED,
+            "POS SHOPRITE LEKKI": NOT_GAMBLING,
+        }
+        for description, label in cases.items():
+            with self.subTest(description):
+                self.assertEqual(classify_description(description), label)
+
+
+class AmountTests(TestCase):
+    def test_parse_amounts(self):
+        amounts = parse_amounts(["(500.00)", "1,234.50 CR", "-"]).tolist()
+
+        self.assertEqual(amounts[:2], [-500.0, 1234.5])
+        self.assertTrue(math.isnan(amounts[2]))
+
+    def test_negative_credits_are_outflows(self):
+        inflow, outflow = parse_flows(
+            ["(500.00)", "1,234.50 CR", "-", ""],
+            ["", "", "-30.00", "40.00 CR"],
+        )
+
+        self.assertEqual(inflow.tolist(), [0.0, 1234.5, 0.0, 40.0])
+        self.assertEqual(outflow.tolist(), [500.0, 0.0, 30.0, 0.0])
+
+    @mock.patch("builtins.print")
+    def test_monthly_totals_are_rounded(self, _print):
+        day = date.today().strftime("%d-%b-%Y")
+        summary = TransactionSummary(
+            [[day, "a", "0.10", ""], [day, "b", "0.20", ""], [day, "c", "(500.00)", ""]]
+        ).generate_monthly_summary()
+
+        totals = summary.iloc[-1]
+        self.assertEqual(totals["Income"], 0.3)
+        self.assertEqual(totals["Expenses"], 500.0)
+        self.assertEqual(totals["Savings"], -499.7)
+
+
+class BalanceValidationTests(TestCase):
+    def test_swapped_cells_in_oldest_first_rows(self):
+        rows = [
+            {"Credit": "", "Debit": "", "Balance": "1,000.00", "Page": 0},
+            {"Credit": "500.00", "Debit": "", "Balance": "1,500.00", "Page": 0},
+            {"Credit": "200.00", "Debit": "", "Balance": "1,300.00", "Page": 0},
+            {"Credit": "", "Debit": "100.00", "Balance": "9,999.00", "Page": 1},
+        ]
+        check = validate_rows(rows)
+
+        self.assertFalse(check.descending)
+        self.assertEqual(check.swapped_rows, [2])
+        self.assertEqual((rows[2]["Credit"], rows[2]["Debit"]), ("", "200.00"))
+        self.assertEqual(check.inconsistent_rows, [3])
+        self.assertEqual(check.flagged_pages, [1])
+
+    def test_swapped_cells_in_newest_first_rows(self):
+        rows = [
+            {"Credit": "50.00", "Debit": "", "Balance": "1,250.00", "Page": 0},
+            {"Credit": "", "Debit": "200.00", "Balance": "1,300.00", "Page": 0},
+            {"Credit": "500.00", "Debit": "", "Balance": "1,500.00", "Page": 0},
+            {"Credit": "", "Debit": "", "Balance": "1,000.00", "Page": 0},
+        ]
+        check = validate_rows(rows)
+
+        self.assertTrue(check.descending)
+        self.assertEqual(check.swapped_rows, [0])
+        self.assertEqual((rows[0]["Credit"], rows[0]["Debit"]), ("", "50.00"))
+        self.assertEqual(check.inconsistent_rows, [])
+
+
+@override_settings(PIPELINE_RETRY_BACKOFF=0, PIPELINE_DB_CHECKPOINTS=True)
+class AnalysisPipelineTests(TestCase):
+    ROWS = [
+        ["02-Jan-2023", "SALARY", "1,000.00", ""],
+        ["03-Jan-2023", "POS SHOPRITE", "", "200.00"],
+    ]
+
+    def setUp(self):
+        self.session = SimpleNamespace(
+            document_id="doc-resume",
+            pdf_type=2,
+            extractor=SimpleNamespace(content_hash="hash-resume"),
+            get_category=lambda: 2,
+        )
+        self.extract = mock.patch.object(
+            AnalysisPipeline,
+            "extract",
+            autospec=True,
+            return_value={
+                "rows": self.ROWS,
+                "columns": ["Date", "Description", "Credit", "Debit"],
+                "balance_validation": None,
+            },
+        ).start()
+        mock.patch("builtins.print").start()
+        self.addCleanup(mock.patch.stopall)
+
+    @override_settings(PIPELINE_STAGE_MAX_ATTEMPTS=2)
+    def test_retry_resumes_after_failed_stage(self):
+        gambling = {"gambling": False, "area_found": []}
+        check_gambling = mock.patch.object(
+            AnalysisPipeline,
+            "check_gambling",
+            side_effect=[
+                TimeoutError("llm"),
+                TimeoutError("llm"),
+                {"gambling_activities": gambling},
+            ],
+        ).start()
+        pipeline = AnalysisPipeline(self.session)
+
+        with self.assertRaises(PipelineStageError) as raised:
+            pipeline.run()
+        self.assertEqual(raised.exception.stage, "gambling")
+        result = pipeline.run()
+
+        self.assertEqual(check_gambling.call_count, 3)
+        self.assertEqual(self.extract.call_count, 1)
+        self.assertEqual(result["gambling_activities"], gambling)
+        self.assertEqual(AnalysisCheckpoint.objects.count(), 0)
+
+    def test_new_pipeline_resumes_from_stored_checkpoints(self):
+        class WorkerDied(Exception):
+            pass
+
+        def stop_at_gambling(stage):
+            if stage == "gambling":
+                raise WorkerDied()
+
+        with self.assertRaises(WorkerDied):
+            AnalysisPipeline(self.session, on_stage=stop_at_gambling).run()
+        self.assertEqual(
+            set(AnalysisCheckpoint.objects.values_list("stage", flat=True)),
+            {"categorize", "extract", "summarize"},
+        )
+
+        stages = []
+        with mock.patch.object(
+            AnalysisPipeline,
+            "check_gambling",
+            return_value={"gambling_activities": {"gambling": False}},
+        ):
+            AnalysisPipeline(self.session, on_stage=stages.append).run()
+
+        self.assertEqual(self.extract.call_count, 1)
+        self.assertEqual(stages, ["download", "gambling", "store"])
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class AnalysisJobTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username="analyst", email="analyst@example.com", password="pw-12345!"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.delay = mock.patch.object(tasks.run_analysis_job, "delay").start()
+        self.addCleanup(mock.patch.stopall)
+
+    def submit(self, document_id="doc-1"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse("analysis_job_submit"),
+                {"document_id": document_id},
+                format="json",
+            )
+
+    def test_submit_and_poll(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.delay.assert_called_once_with(job_id)
+
+        # A second submission returns the active job instead of queueing another
+        self.assertEqual(self.submit().json()["job_id"], job_id)
+        self.assertEqual(self.delay.call_count, 1)
+
+        with mock.patch.object(
+            tasks, "get_stored_analysis", return_value={"monthly_summary": []}
+        ):
+            tasks.run_analysis_job(job_id)
+
+        poll = self.client.get(response.json()["poll_url"])
+        self.assertEqual(poll.status_code, 200)
+        self.assertEqual(poll.json()["status"], AnalysisJob.STATUS_COMPLETED)
+        self.assertEqual(poll.json()["result"], {"monthly_summary": []})
+
+    def test_jobs_are_private_to_their_owner(self):
+        poll_url = self.submit().json()["poll_url"]
+        other = APIClient()
+        other.force_authenticate(
+            get_user_model().objects.create_user(
+                username="other", email="other@example.com", password="pw-12345!"
+            )
+        )
+
+        self.assertEqual(other.get(poll_url).status_code, 404)
+        self.assertEqual(APIClient().get(poll_url).status_code, 401)
+
+    def test_broker_failure_fails_the_job(self):
+        self.delay.side_effect = ConnectionError("broker down")
+
+        job_id = self.submit().json()["job_id"]
+
+        job = AnalysisJob.objects.get(id=job_id)
+        self.assertEqual(job.status, AnalysisJob.STATUS_FAILED)
+        self.assertEqual(job.error, "Job could not be queued")
+
+    def test_stale_job_is_abandoned_on_resubmission(self):
+        stale_id = self.submit().json()["job_id"]
+        AnalysisJob.objects.filter(id=stale_id).update(
+            status=AnalysisJob.STATUS_RUNNING,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+
+        job_id = self.submit().json()["job_id"]
+
+        self.assertNotEqual(job_id, stale_id)
+        self.assertEqual(
+            AnalysisJob.objects.get(id=stale_id).status, AnalysisJob.STATUS_FAILED
+        )
+
+    def test_abandoned_job_is_not_finished_by_its_worker(self):
+        job_id = self.submit().json()["job_id"]
+
+        def abandon(document_id):
+            AnalysisJob.objects.filter(id=job_id).update(
+                status=AnalysisJob.STATUS_FAILED
+            )
+            return {"monthly_summary": []}
+
+        with mock.patch.object(tasks, "get_stored_analysis", side_effect=abandon):
+            tasks.run_analysis_job(job_id)
+
+        job = AnalysisJob.objects.get(id=job_id)
+        self.assertEqual(job.status, AnalysisJob.STATUS_FAILED)
+        self.assertIsNone(job.result)
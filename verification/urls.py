@@ -32,4 +32,15 @@ urlpatterns = [
         views.BankStatementView.as_view(),
         name="bank_income",
     ),
+    path(
+        "bank-statement-jobs/",
+        views.AnalysisJobSubmitView.as_view(),
+        name="analysis_job_submit",
+    ),
+    path(
+        "bank-statement-jobs/<uuid:job_id>/",
+        views.AnalysisJobView.as_view(),
+        name="analysis_job",
+    ),
+    path("metrics/", views.MetricsView.as_view(), name="metrics"),
 ]
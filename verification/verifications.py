@@ -5,8 +5,6 @@ import uuid
 from smtplib import SMTPServerDisconnected
 from urllib.parse import urlparse
 
-import openai
-import requests
 from decouple import config
 from django.conf import settings
 from django.core.mail import send_mail
@@ -16,6 +14,8 @@ from langchain_community.document_loaders import OnlinePDFLoader
 
 from bankanalysis.configs.logging_config import configure_logger
 from helpers import chat_utils
+from helpers.http_client import get_http_client
+from helpers.llm_backend import get_llm_backend
 from verification.models import EmploymentVerification
 
 logger = configure_logger(__name__)
@@ -28,12 +28,12 @@ USER_ROLE = "user"
 BASE_URL = settings.APP_BASE_URL
 
 
-def create_openai_request(model, messages, functions, function_name, function_args):
-    return openai.ChatCompletion.create(
+def create_openai_request(model, messages, functions, function_name):
+    return get_llm_backend().chat_completion(
         model=model,
         messages=messages,
         functions=functions,
-        function_call={"name": function_name, "arguments": json.dumps(function_args)},
+        function_call={"name": function_name},
     )
 
 
@@ -137,7 +137,7 @@ def get_website_rep_details(company_website_url):
 
     headers = {"Cache-Control": "no-cache", "Content-Type": "application/json"}
 
-    response = requests.post(API_URL, headers=headers, json=data)
+    response = get_http_client().post(API_URL, headers=headers, json=data)
     if response.status_code != 200:
         logger.error(
             f"API request failed with status code {response.status_code}. Reason: {response.text}"
@@ -183,7 +183,6 @@ def birth_certificate(document_id):
         messages=messages,
         functions=chat_utils.BIRTH_CERTIFICATE_FUNCTIONS_PARAMS,
         function_name="get_birth_certificate_entities",
-        function_args={},
     )
 
     birth_certificate_entities = handle_openai_response(response)
@@ -275,7 +274,6 @@ def employee_letter(document_id):
         messages=messages,
         functions=chat_utils.EMPLOYMENT_LETTER_FUNCTIONS_PARAMS,
         function_name="get_employment_letter_entities",
-        function_args={},
     )
 
     employee_letter_entities = handle_openai_response(response)
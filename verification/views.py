@@ -1,19 +1,21 @@
 import json
 import os
 
-import requests
 from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
-from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from verification.models import EmploymentVerification
-from verification.pdf.analyze import get_pdf_category
-from verification.tasks import process_pdf_task
+from helpers.http_client import get_http_client
+from verification.models import AnalysisJob, EmploymentVerification
+from verification.pdf.analyze import get_stored_analysis
+from verification.pdf.llm_cache import get_llm_cache
+from verification.tasks import is_allowed_webhook_url, submit_analysis_job
 from verification.verifications import birth_certificate, employee_letter
 
 
@@ -39,7 +41,7 @@ def confirm_employment(request):
         verification.save()
 
         response_data = {"status": "confirmed", "token": token}
-        requests.post(CALLBACK_URL, data=response_data)
+        get_http_client().post(CALLBACK_URL, data=response_data)
 
         return HttpResponse("Employment confirmed.")
     except EmploymentVerification.DoesNotExist:
@@ -55,7 +57,7 @@ def deny_employment(request):
         verification.save()
 
         response_data = {"status": "denied", "token": token}
-        requests.post(CALLBACK_URL, data=response_data)
+        get_http_client().post(CALLBACK_URL, data=response_data)
 
         return HttpResponse("Employment denied.")
     except EmploymentVerification.DoesNotExist:
@@ -98,22 +100,73 @@ def get_employment_verification_info(request, token):
 #         return JsonResponse({"data": data})
 
 
-class BankStatementView(View):
+def _job_response(job, request, status=202):
+    data = job.to_dict()
+    data["poll_url"] = request.build_absolute_uri(
+        reverse("analysis_job", args=[job.id])
+    )
+    return JsonResponse(data, status=status)
+
+
+class BankStatementView(APIView):
+    # Same access as the job it hands out a poll_url for
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, document_id):
         # public_url = "https://res.cloudinary.com/giddaa/image/upload/c_scale,w_1000/q_auto:good/133512587437717390.pdf"
 
-        # Process the URL as before
-        pdf_type, public_url = get_pdf_category(document_id)
-
-        if pdf_type in [1, 2]:
-            result = process_pdf_task.apply(args=[pdf_type, public_url]).get()
+        # Serve a stored result without downloading anything when we can
+        result = get_stored_analysis(document_id)
+        if result is not None:
             return JsonResponse({"status": "completed", "result": result})
-        elif pdf_type == 3:
-            process_pdf_task.delay(pdf_type, public_url)
-            return JsonResponse(
-                {
-                    "status": "Analysis on this PDF would take about 60 secs so please check back"
-                }
-            )
-
-        return JsonResponse({"error": "Invalid PDF type"}, status=400)
+
+        # Everything else, including the download and categorization, runs on a worker
+        job = submit_analysis_job(document_id, request.user)
+        return _job_response(job, request)
+
+
+class AnalysisJobSubmitView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        data = request.data
+        document_id = str(data.get("document_id") or "").strip()
+        if not document_id:
+            return JsonResponse({"error": "document_id is required"}, status=400)
+
+        # The finished analysis is posted to the webhook, so only configured hosts are
+        # accepted, see ANALYSIS_WEBHOOK_ALLOWED_HOSTS
+        webhook_url = str(data.get("webhook_url") or "").strip()
+        if webhook_url and not is_allowed_webhook_url(webhook_url):
+            return JsonResponse({"error": "webhook_url is not allowed"}, status=400)
+
+        job = submit_analysis_job(document_id, request.user, webhook_url=webhook_url)
+        return _job_response(job, request)
+
+
+class AnalysisJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        jobs = AnalysisJob.objects.filter(id=job_id)
+        if not request.user.is_staff:
+            # Other users' jobs are reported as missing rather than forbidden
+            jobs = jobs.filter(created_by=request.user)
+        job = jobs.first()
+        if job is None:
+            return JsonResponse({"error": "Job not found"}, status=404)
+        return _job_response(job, request, status=200)
+
+
+class MetricsView(APIView):
+    # Internal counters (hosts called, LLM call sites), for staff only
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        llm_cache = get_llm_cache()
+        return JsonResponse(
+            {
+                "http": get_http_client().metrics.snapshot(),
+                "llm_cache": llm_cache.metrics.snapshot() if llm_cache else {},
+            }
+        )